@@ -0,0 +1,145 @@
+import re
+import time
+
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """
+    Edit distance between a and b, or max_distance + 1 once it is certain to
+    exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            current.append(value)
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """
+    Typo-tolerant course index over code, codeWithSpace, name and instructors.
+
+    Every distinct lowercase token is stored once with the courses (and field
+    weight) it appears in; a trigram -> tokens map finds candidate tokens for a
+    misspelled query word, which are then scored by exact/prefix match or
+    bounded edit distance. Course scores sum the best token score of each query
+    word, so 'calclus', 'cop3502' and 'orgo chem' still rank sensible courses.
+    """
+
+    FIELD_WEIGHTS = {'code': 1.5, 'name': 1.0, 'instructors': 0.6}
+    TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+    def __init__(self, rows):
+        """
+        rows: iterable of (code, codeWithSpace, name, instructors) tuples.
+        """
+        self.tokens = []
+        self.token_ids = {}
+        self.postings = []
+        self.trigram_index = {}
+
+        for code, codeWithSpace, name, instructors in rows:
+            code_tokens = set(self.tokenize(codeWithSpace or ''))
+            compact = code.lower()
+            code_tokens.update([compact, compact.rstrip('abcdefghijklmnopqrstuvwxyz')])
+            self._add_tokens(code, code_tokens, self.FIELD_WEIGHTS['code'])
+            self._add_tokens(code, self.tokenize(name or ''), self.FIELD_WEIGHTS['name'])
+            self._add_tokens(code, self.tokenize(instructors or ''), self.FIELD_WEIGHTS['instructors'])
+
+        for token_id, token in enumerate(self.tokens):
+            for gram in trigrams(token):
+                self.trigram_index.setdefault(gram, []).append(token_id)
+
+    @classmethod
+    def tokenize(cls, text):
+        return cls.TOKEN_PATTERN.findall(text.lower())
+
+    def _add_tokens(self, code, tokens, weight):
+        for token in tokens:
+            if not token:
+                continue
+            token_id = self.token_ids.get(token)
+            if token_id is None:
+                token_id = self.token_ids[token] = len(self.tokens)
+                self.tokens.append(token)
+                self.postings.append({})
+            posting = self.postings[token_id]
+            posting[code] = max(posting.get(code, 0.0), weight)
+
+    def _token_score(self, word, token):
+        if token == word:
+            return 1.0
+        if token.startswith(word):
+            return 0.8 + 0.2 * len(word) / len(token)
+        max_distance = 1 if len(word) <= 5 else 2
+        distance = bounded_levenshtein(word, token, max_distance)
+        if distance <= max_distance:
+            return 0.9 * (1 - distance / max(len(word), len(token)))
+        # A typo inside what the user has typed so far ('calcl' for 'calculus').
+        if len(word) >= 4 and len(token) > len(word):
+            distance = bounded_levenshtein(word, token[:len(word)], max_distance)
+            if distance <= max_distance:
+                return 0.7 * (1 - distance / len(word))
+        return 0.0
+
+    def _candidates(self, word, max_candidates):
+        grams = trigrams(word)
+        counts = {}
+        for gram in grams:
+            for token_id in self.trigram_index.get(gram, ()):
+                counts[token_id] = counts.get(token_id, 0) + 1
+        threshold = max(1, len(grams) // 3)
+        ranked = sorted((token_id for token_id, count in counts.items() if count >= threshold),
+                        key=lambda token_id: -counts[token_id])
+        exact = self.token_ids.get(word)
+        if exact is not None and exact not in ranked[:max_candidates]:
+            ranked.insert(0, exact)
+        return ranked[:max_candidates]
+
+    def search(self, query, limit, budget_ms=50, max_candidates=64):
+        """
+        Returns up to `limit` course codes ranked by fuzzy score. Scoring stops
+        once budget_ms has elapsed and the best results found so far are
+        returned.
+        """
+        deadline = time.perf_counter() + budget_ms / 1000
+        words = self.tokenize(query)
+        if not words:
+            return []
+        # 'cop 3502' typed as separate words also matches the compact code token.
+        if len(words) > 1 and words[0].isalpha() and words[1][:1].isdigit():
+            words = [words[0] + words[1]] + words[2:]
+
+        scores = {}
+        for word in words:
+            best = {}
+            for token_id in self._candidates(word, max_candidates):
+                if time.perf_counter() > deadline:
+                    break
+                token_score = self._token_score(word, self.tokens[token_id])
+                if token_score <= 0:
+                    continue
+                for code, weight in self.postings[token_id].items():
+                    score = token_score * weight
+                    if score > best.get(code, 0.0):
+                        best[code] = score
+            for code, score in best.items():
+                scores[code] = scores.get(code, 0.0) + score
+            if time.perf_counter() > deadline:
+                break
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [code for code, _ in ranked[:limit]]
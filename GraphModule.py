@@ -0,0 +1,253 @@
+import json
+from array import array
+
+
+class CodeTable:
+    """
+    Interns course node labels (e.g. 'COP\n3502') as small integer ids.
+    One table is shared by every prerequisite graph of a term.
+    """
+
+    __slots__ = ('ids', 'codes', '_json_labels')
+
+    def __init__(self):
+        self.ids = {}
+        self.codes = []
+        self._json_labels = []
+
+    def intern(self, code):
+        code_id = self.ids.get(code)
+        if code_id is None:
+            code_id = self.ids[code] = len(self.codes)
+            self.codes.append(code)
+            self._json_labels.append(json.dumps(code))
+        return code_id
+
+    def json_label(self, code_id):
+        return self._json_labels[code_id]
+
+
+class PrereqGraph:
+    """
+    Directed prerequisite graph stored as parallel arrays of source and target
+    ids from a CodeTable. Edges are expected to be unique.
+
+    Nodes are ordered by first appearance (source before target), which is the
+    order networkx.DiGraph would report after the same add_edge calls.
+    """
+
+    __slots__ = ('table', 'sources', 'targets', '_node_ids', '_edges_json')
+
+    def __init__(self, table, edges=()):
+        self.table = table
+        self.sources = array('l')
+        self.targets = array('l')
+        for source, target in edges:
+            self.sources.append(source)
+            self.targets.append(target)
+        self._node_ids = None
+        self._edges_json = None
+
+    def __len__(self):
+        return len(self.sources)
+
+    def node_ids(self):
+        if self._node_ids is None:
+            seen = {}
+            for source, target in zip(self.sources, self.targets):
+                seen[source] = None
+                seen[target] = None
+            self._node_ids = array('l', seen)
+        return self._node_ids
+
+    def edges_json(self):
+        """
+        Returns the Cytoscape edge list as JSON text; built once per graph.
+        """
+        if self._edges_json is None:
+            label = self.table.json_label
+            self._edges_json = '[' + ','.join(
+                '{"data":{"source":' + label(source) + ',"target":' + label(target) + '}}'
+                for source, target in zip(self.sources, self.targets)
+            ) + ']'
+        return self._edges_json
+
+    def _node_elements(self, taken_nodes, suffix=''):
+        ids = self.table.ids
+        label = self.table.json_label
+        taken = dict.fromkeys(taken_nodes)
+        taken_ids = {ids[node] for node in taken if node in ids}
+
+        for node in taken:
+            yield '{"classes":"selected","data":{"id":' + json.dumps(node) + '}' + suffix + '}'
+        for node_id in self.node_ids():
+            if node_id not in taken_ids:
+                yield '{"classes":"not_selected","data":{"id":' + label(node_id) + '}' + suffix + '}'
+
+    def cytoscape_json(self, taken_nodes):
+        """
+        Returns the {"edges": [...], "nodes": [...]} payload as JSON text.
+        taken_nodes come first and are marked "selected"; they may include
+        labels that are not in the graph.
+        """
+        return '{"edges":' + self.edges_json() + ',"nodes":[' + ','.join(self._node_elements(taken_nodes)) + ']}'
+
+    def cytoscape_lines(self, taken_nodes):
+        """
+        Yields the same elements one per line for NDJSON streaming, tagged
+        with Cytoscape's "group" field: every node, then every edge.
+        """
+        for node in self._node_elements(taken_nodes, ',"group":"nodes"'):
+            yield node + '\n'
+        label = self.table.json_label
+        for source, target in zip(self.sources, self.targets):
+            yield '{"data":{"source":' + label(source) + ',"target":' + label(target) + '},"group":"edges"}\n'
+
+
+class ReachabilityIndex:
+    """
+    Transitive prerequisite index over plain course codes (e.g. 'COP3502').
+
+    Built once per term: prerequisite cycles are collapsed with Tarjan's
+    algorithm, components are walked in topological order, and every node gets
+    its full set of ancestors as an int bitmask over node ids. Queries are then
+    bitwise ORs/ANDs instead of graph traversals.
+    """
+
+    def __init__(self, prereqs_by_code):
+        self.table = CodeTable()
+        for code, prereqs in prereqs_by_code.items():
+            self.table.intern(code)
+            for prereq in prereqs:
+                self.table.intern(prereq)
+
+        ids = self.table.ids
+        size = len(self.table.codes)
+        preds = [[] for _ in range(size)]
+        succs = [[] for _ in range(size)]
+        for code, prereqs in prereqs_by_code.items():
+            for prereq in prereqs:
+                preds[ids[code]].append(ids[prereq])
+                succs[ids[prereq]].append(ids[code])
+
+        self.direct = [0] * size
+        for node_id, node_preds in enumerate(preds):
+            for pred in node_preds:
+                self.direct[node_id] |= 1 << pred
+
+        components = self._strongly_connected(succs)
+        # Tarjan emits components sinks first; reverse for prerequisites first.
+        components.reverse()
+        component_of = [0] * size
+        for index, members in enumerate(components):
+            for node_id in members:
+                component_of[node_id] = index
+
+        self.ancestors = [0] * size
+        self.topo_rank = [0] * size
+        rank = 0
+        for index, members in enumerate(components):
+            mask = 0
+            for node_id in members:
+                self.topo_rank[node_id] = rank
+                rank += 1
+                for pred in preds[node_id]:
+                    if component_of[pred] != index:
+                        mask |= (1 << pred) | self.ancestors[pred]
+            if len(members) > 1:
+                for node_id in members:
+                    mask |= 1 << node_id
+            for node_id in members:
+                self.ancestors[node_id] = mask
+
+    @staticmethod
+    def _strongly_connected(succs):
+        """
+        Iterative Tarjan's algorithm. Returns components in reverse topological order.
+        """
+        index_of = [-1] * len(succs)
+        lowlink = [0] * len(succs)
+        on_stack = [False] * len(succs)
+        stack = []
+        components = []
+        counter = 0
+
+        for root in range(len(succs)):
+            if index_of[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node_id, child = work.pop()
+                if child == 0:
+                    index_of[node_id] = lowlink[node_id] = counter
+                    counter += 1
+                    stack.append(node_id)
+                    on_stack[node_id] = True
+                if child < len(succs[node_id]):
+                    work.append((node_id, child + 1))
+                    nxt = succs[node_id][child]
+                    if index_of[nxt] == -1:
+                        work.append((nxt, 0))
+                    elif on_stack[nxt]:
+                        lowlink[node_id] = min(lowlink[node_id], index_of[nxt])
+                    continue
+                # All children visited: propagate lowlink to the parent frame.
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node_id])
+                if lowlink[node_id] == index_of[node_id]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        members.append(member)
+                        if member == node_id:
+                            break
+                    components.append(members)
+        return components
+
+    def mask_of(self, codes):
+        ids = self.table.ids
+        mask = 0
+        for code in codes:
+            if code in ids:
+                mask |= 1 << ids[code]
+        return mask
+
+    def codes_in(self, mask):
+        """
+        Returns the codes whose bits are set in mask, prerequisites first.
+        """
+        codes = self.table.codes
+        bits = bin(mask)[:1:-1]
+        found = [node_id for node_id, bit in enumerate(bits) if bit == '1']
+        found.sort(key=self.topo_rank.__getitem__)
+        return [codes[node_id] for node_id in found]
+
+    def closure_mask(self, codes):
+        """
+        Returns the mask of every transitive prerequisite of codes.
+        """
+        ids = self.table.ids
+        mask = 0
+        for code in codes:
+            if code in ids:
+                mask |= self.ancestors[ids[code]]
+        return mask
+
+    def unlocked(self, satisfied_mask, candidates, include_open=True):
+        """
+        Returns the candidate codes that are not yet in satisfied_mask and
+        whose direct prerequisites are all in it. Codes with no prerequisites
+        at all are included unless include_open is False.
+        """
+        ids = self.table.ids
+        result = []
+        for code in candidates:
+            node_id = ids.get(code)
+            if node_id is None:
+                continue
+            direct = self.direct[node_id]
+            if (direct or include_open) and not (satisfied_mask >> node_id) & 1 and not direct & ~satisfied_mask:
+                result.append(code)
+        return result
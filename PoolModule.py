@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+import time
+
+
+class ConnectionPool:
+    """
+    Read-only SQLite connections keyed by (year, term), one per worker thread.
+
+    Each thread keeps its own connection per key for the life of the process,
+    so the schema, page cache and prepared statements (sqlite3 caches them per
+    connection by SQL text) survive between requests. invalidate() bumps a
+    key's generation; threads drop and reopen their stale connection the next
+    time they ask for it.
+
+    The files are opened as immutable: they are term snapshots that are never
+    written after being published. A caller may pass the snapshot path it is
+    bound to; a thread's connection is reopened whenever the path it was
+    opened on differs, so a request never mixes two snapshots.
+    """
+
+    # SQLite's default SQLITE_MAX_ATTACHED.
+    ATTACH_LIMIT = 10
+
+    def __init__(self, db_name_for, mmap_size=256 * 1024 * 1024, cache_size_kib=16 * 1024,
+                 cached_statements=128):
+        self._db_name_for = db_name_for
+        self._mmap_size = mmap_size
+        self._cache_size_kib = cache_size_kib
+        self._cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generations = {}
+        self._stats = {
+            'hits': 0,
+            'opens': 0,
+            'reopens': 0,
+            'open_connections': 0,
+            'wait_time': 0.0,
+            'open_time': 0.0,
+        }
+
+    def _open(self, path):
+        conn = sqlite3.connect(
+            f'file:{path}?mode=ro&immutable=1',
+            uri=True,
+            cached_statements=self._cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA mmap_size={int(self._mmap_size)};')
+        conn.execute(f'PRAGMA cache_size=-{int(self._cache_size_kib)};')
+        conn.execute('PRAGMA temp_store=MEMORY;')
+        conn.execute('PRAGMA query_only=1;')
+        return conn
+
+    def _open_attached(self, paths):
+        conn = sqlite3.connect('file::memory:', uri=True, cached_statements=self._cached_statements)
+        conn.row_factory = sqlite3.Row
+        for i, path in enumerate(paths):
+            conn.execute(f'ATTACH DATABASE ? AS t{i};', (f'file:{path}?mode=ro&immutable=1',))
+            conn.execute(f'PRAGMA t{i}.mmap_size={int(self._mmap_size)};')
+            conn.execute(f'PRAGMA t{i}.cache_size=-{int(self._cache_size_kib)};')
+        conn.execute('PRAGMA temp_store=MEMORY;')
+        conn.execute('PRAGMA query_only=1;')
+        return conn
+
+    def get(self, year, term, path=None):
+        """
+        Returns this thread's connection for (year, term) on path (by default
+        the key's current file), opening it on first use, after the key has
+        been invalidated or when path changed.
+        """
+        key = (year, term)
+        path = path or self._db_name_for(year, term)
+        with self._lock:
+            generation = (self._generations.get(key, 0), path)
+        return self._get(key, generation, lambda: self._open(path))
+
+    def get_attached(self, keys, paths=None):
+        """
+        Returns this thread's connection with the DB of each (year, term) in
+        keys (or each file in paths, one per key) attached read-only as
+        schemas t0, t1, ... in order. It is reopened once any of the keys has
+        been invalidated or their paths changed. At most ATTACH_LIMIT keys fit
+        on one connection.
+        """
+        keys = tuple(keys)
+        if len(keys) > self.ATTACH_LIMIT:
+            raise ValueError(f'at most {self.ATTACH_LIMIT} databases can be attached')
+        paths = tuple(paths) if paths is not None else tuple(self._db_name_for(*key) for key in keys)
+        with self._lock:
+            generation = tuple(self._generations.get(key, 0) for key in keys) + paths
+        return self._get(('attached',) + keys, generation, lambda: self._open_attached(paths))
+
+    def _get(self, key, generation, opener):
+        started = time.perf_counter()
+        conns = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+
+        cached = conns.get(key)
+        if cached is not None and cached[0] == generation:
+            with self._lock:
+                self._stats['hits'] += 1
+                self._stats['wait_time'] += time.perf_counter() - started
+            return cached[1]
+
+        reopened = cached is not None
+        if reopened:
+            cached[1].close()
+            del conns[key]
+
+        open_started = time.perf_counter()
+        conn = opener()
+        conns[key] = (generation, conn)
+        finished = time.perf_counter()
+
+        with self._lock:
+            self._stats['opens'] += 1
+            self._stats['open_time'] += finished - open_started
+            self._stats['wait_time'] += finished - started
+            if reopened:
+                self._stats['reopens'] += 1
+            else:
+                self._stats['open_connections'] += 1
+        return conn
+
+    def invalidate(self, year, term):
+        """
+        Marks every thread's connection for (year, term) as stale.
+        """
+        with self._lock:
+            key = (year, term)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats['hits'] + stats['opens']
+        stats['requests'] = requests
+        stats['hit_rate'] = stats['hits'] / requests if requests else 0.0
+        stats['avg_wait_ms'] = stats['wait_time'] * 1000 / requests if requests else 0.0
+        return stats
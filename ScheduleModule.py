@@ -0,0 +1,111 @@
+DAYS = 'MTWRFSU'
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+
+def time_slot(time_str):
+    """
+    Converts 'HH:MM' (24-hour) to a slot index within the day, or None.
+    """
+    try:
+        hours, minutes = time_str.split(':')
+        return (int(hours) * 60 + int(minutes)) // SLOT_MINUTES
+    except (AttributeError, ValueError):
+        return None
+
+
+def section_mask(section):
+    """
+    Encodes a section's meetTimes as a week bitmask: each day owns a fixed
+    SLOTS_PER_DAY-bit field and every 5-minute slot the section occupies is
+    set. Two sections conflict exactly when their masks share a bit.
+    Sections without parseable meeting times get 0 and never conflict.
+    """
+    mask = 0
+    for meet_time in section.get('meetTimes', []):
+        begin = time_slot(meet_time.get('meetTimeBegin'))
+        end = time_slot(meet_time.get('meetTimeEnd'))
+        if begin is None or end is None or end <= begin:
+            continue
+        span = ((1 << (end - begin)) - 1) << begin
+        for day in meet_time.get('meetDays', []):
+            if day in DAYS:
+                mask |= span << (DAYS.index(day) * SLOTS_PER_DAY)
+    return mask
+
+
+class ScheduleBuilder:
+    """
+    Enumerates conflict-free section combinations, one section per course.
+
+    Sections of a course with identical masks are grouped, so the search
+    branches once per distinct meeting pattern; courses with the fewest
+    patterns are placed first. Backtracking keeps the union of chosen masks
+    and prunes any pattern that ANDs non-zero with it.
+    """
+
+    def __init__(self, courses):
+        """
+        courses: list of (code, sections) pairs.
+        """
+        self.courses = []
+        for position, (code, sections) in enumerate(courses):
+            groups = {}
+            for section in sections:
+                groups.setdefault(section_mask(section), []).append(section)
+            self.courses.append((position, code, list(groups.items())))
+        self.courses.sort(key=lambda course: len(course[2]))
+
+    def patterns(self):
+        """
+        Yields one list of (code, [equivalent sections]) per conflict-free
+        combination of meeting patterns, in the order the courses were given.
+        """
+        if not self.courses or any(not groups for _, _, groups in self.courses):
+            return
+        depth_count = len(self.courses)
+        chosen = [None] * depth_count
+        # Each frame: (depth, occupied mask, next group index to try).
+        stack = [(0, 0, 0)]
+        while stack:
+            depth, occupied, group_index = stack.pop()
+            position, code, groups = self.courses[depth]
+            while group_index < len(groups):
+                mask, sections = groups[group_index]
+                group_index += 1
+                if mask & occupied:
+                    continue
+                chosen[position] = (code, sections)
+                if depth + 1 == depth_count:
+                    yield list(chosen)
+                    continue
+                stack.append((depth, occupied, group_index))
+                stack.append((depth + 1, occupied | mask, 0))
+                break
+
+    def schedules(self, limit):
+        """
+        Yields up to `limit` schedules, each a list of (code, section) pairs.
+        """
+        produced = 0
+        for pattern in self.patterns():
+            for combination in self._expand(pattern):
+                yield combination
+                produced += 1
+                if produced >= limit:
+                    return
+
+    @staticmethod
+    def _expand(pattern):
+        indexes = [0] * len(pattern)
+        while True:
+            yield [(code, sections[i]) for (code, sections), i in zip(pattern, indexes)]
+            position = len(pattern) - 1
+            while position >= 0:
+                indexes[position] += 1
+                if indexes[position] < len(pattern[position][1]):
+                    break
+                indexes[position] = 0
+                position -= 1
+            if position < 0:
+                return
@@ -0,0 +1,80 @@
+import json
+from collections.abc import Mapping
+
+
+class CourseStore(Mapping):
+    """
+    Read-only code -> course mapping for one (year, term) backed by the term's
+    SQLite `course_blobs` table.
+
+    Only the code -> deptName index is kept in memory; course bodies stay on
+    disk (shared by every worker through the OS page cache and mmap) and are
+    decoded on demand. Use get_blobs() to fetch the stored JSON bytes without
+    decoding them at all.
+
+    A store is bound to one immutable snapshot file (path), which dept_map
+    was read from, so membership always agrees with the rows it returns.
+    Requests should take the store once and run their SQL on conn().
+    """
+
+    def __init__(self, year, term, pool, dept_map, path=None):
+        self.year = year
+        self.term = term
+        self.path = path
+        self._pool = pool
+        self.dept_map = dept_map
+        self.sorted_codes = sorted(dept_map)
+
+    def conn(self):
+        """
+        Returns this thread's pooled connection to the store's snapshot.
+        """
+        return self._pool.get(self.year, self.term, self.path)
+
+    def __getitem__(self, code):
+        row = self.conn().execute('SELECT body FROM course_blobs WHERE code = ?;', (code,)).fetchone()
+        if row is None:
+            raise KeyError(code)
+        return json.loads(row[0])
+
+    def __iter__(self):
+        return iter(self.dept_map)
+
+    def __len__(self):
+        return len(self.dept_map)
+
+    def __contains__(self, code):
+        return code in self.dept_map
+
+    def get_blob(self, code, default=None):
+        row = self.conn().execute('SELECT body FROM course_blobs WHERE code = ?;', (code,)).fetchone()
+        return row[0] if row is not None else default
+
+    def get_blobs(self, codes, default=None):
+        """
+        Returns the serialized course for each code, in order, using one query.
+        Codes that are not stored map to `default`.
+        """
+        wanted = list(dict.fromkeys(codes))
+        found = {}
+        # Stay well below SQLite's bound-parameter limit.
+        for i in range(0, len(wanted), 500):
+            chunk = wanted[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for code, body in self.conn().execute(
+                f'SELECT code, body FROM course_blobs WHERE code IN ({placeholders});', chunk
+            ):
+                found[code] = body
+        return [found.get(code, default) for code in codes]
+
+    def iter_blobs(self, codes, chunk_size=50):
+        """
+        Yields the serialized course for each stored code, in order, fetching
+        chunk_size at a time so only one chunk is held in memory. Codes that
+        are not stored are skipped.
+        """
+        codes = list(codes)
+        for i in range(0, len(codes), chunk_size):
+            for blob in self.get_blobs(codes[i:i + chunk_size]):
+                if blob is not None:
+                    yield blob
@@ -1,35 +1,118 @@
 class TrieNode:
-    def __init__(self):
-        self.children = {}
-        self.end_of_word = False
-        self.courses = []
+    """
+    Radix (path-compressed) prefix index mapping lowercase keys to course codes.
+
+    Each node stores the edge label leading to it, so long keys such as full
+    course names cost one node instead of one per character. find() walks the
+    prefix and returns the first `limit` distinct courses below it in key
+    order. Nodes whose key depth is <= `hot_depth` keep a precomputed top-k
+    list (see precompute_top), so short, high-traffic prefixes like 'co' or
+    'cop3' are answered without traversing their subtree.
+    """
+
+    __slots__ = ('label', 'children', 'courses', 'top')
+
+    def __init__(self, label=''):
+        self.label = label
+        self.children = None
+        self.courses = ()
+        self.top = None
+
+    @property
+    def end_of_word(self):
+        return bool(self.courses)
 
     def add(self, word, course):
         node = self
-        for ch in word:
-            if ch not in node.children:
-                node.children[ch] = TrieNode()
-            node = node.children[ch]
-        node.end_of_word = True
-        node.courses.append(course)
+        i = 0
+        while i < len(word):
+            child = node.children.get(word[i]) if node.children else None
+            if child is None:
+                child = TrieNode(word[i:])
+                if node.children is None:
+                    node.children = {}
+                node.children[word[i]] = child
+                node = child
+                break
 
-    def find(self, prefix, limit):
+            label = child.label
+            j = 1
+            while j < len(label) and i + j < len(word) and label[j] == word[i + j]:
+                j += 1
+            if j < len(label):
+                # Split the edge at the first mismatch.
+                middle = TrieNode(label[:j])
+                child.label = label[j:]
+                middle.children = {label[j]: child}
+                node.children[word[i]] = middle
+                child = middle
+            node = child
+            i += j
+
+        if not node.courses:
+            node.courses = [course]
+        elif course not in node.courses:
+            node.courses.append(course)
+
+    def _locate(self, prefix):
         node = self
-        for ch in prefix:
-            if ch not in node.children:
-                return []
-            node = node.children[ch]
-        return self._retrieve_courses(node, limit)
-
-    def _retrieve_courses(self, node, limit):
-        if limit[0] <= 0:
+        i = 0
+        while i < len(prefix):
+            child = node.children.get(prefix[i]) if node.children else None
+            if child is None:
+                return None
+            label = child.label
+            if label.startswith(prefix[i:]):
+                # The prefix ends on or inside this edge.
+                return child
+            if not prefix.startswith(label, i):
+                return None
+            node = child
+            i += len(label)
+        return node
+
+    def find(self, prefix, limit):
+        node = self._locate(prefix)
+        if node is None:
             return []
+        if node.top is not None and (limit <= len(node.top[0]) or node.top[1]):
+            return node.top[0][:limit]
+        return self._retrieve_courses(node, limit)[0]
+
+    @staticmethod
+    def _retrieve_courses(node, limit):
+        """
+        Iterative depth-first walk in key order. Returns (courses, exhausted):
+        the first `limit` distinct courses and whether the subtree has no more.
+        """
         courses = []
-        if node.end_of_word:
-            num_courses = len(node.courses)
-            courses.extend(node.courses[:limit[0]])
-            limit[0] -= num_courses
-        for child in node.children.values():
-            if limit[0] > 0:
-                courses.extend(self._retrieve_courses(child, limit))
-        return courses
+        seen = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for course in node.courses:
+                if course not in seen:
+                    seen.add(course)
+                    courses.append(course)
+                    if len(courses) >= limit:
+                        return courses, False
+            if node.children:
+                # Reversed so the smallest key is popped first.
+                stack.extend(node.children[ch] for ch in sorted(node.children, reverse=True))
+        return courses, True
+
+    def precompute_top(self, k, hot_depth):
+        """
+        Stores (first k courses, whether that is every course) on each node
+        reached by a key prefix of at most hot_depth characters.
+        """
+        level = [(self, 0)]
+        while level:
+            next_level = []
+            for node, depth in level:
+                node.top = self._retrieve_courses(node, k)
+                for child in (node.children or {}).values():
+                    # A node covers every prefix that ends inside its edge.
+                    if depth + 1 <= hot_depth:
+                        next_level.append((child, depth + len(child.label)))
+            level = next_level
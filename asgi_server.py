@@ -0,0 +1,210 @@
+"""
+ASGI entry point for the course API:
+
+    uvicorn asgi_server:app --host 0.0.0.0 --port 8000
+
+Connections, keep-alive and request bodies are handled on the event loop.
+Each request is then dispatched to the Flask app in server.py (so
+/api/get_courses, /generate_a_list and every other route keep exactly the
+same contract, CORS headers included) on a bounded thread pool, where the
+SQLite and JSON work happens. Idle keep-alive connections hold no thread,
+and one process serves them all from a single copy of the loaded term
+data. Response bodies, including NDJSON streams, are handed back to the
+loop chunk by chunk with backpressure.
+"""
+import asyncio
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from server import app as flask_app
+
+# Requests dispatched to Flask at once; more wait on the event loop.
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+# Largest request body accepted, in bytes.
+ASGI_MAX_BODY = int(os.environ.get('ASGI_MAX_BODY', 1024 * 1024))
+
+executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix='asgi')
+
+
+def wsgi_environ(scope, body):
+    """
+    Builds the WSGI environ Flask expects from an ASGI http scope.
+    """
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+class ClientDisconnected(Exception):
+    """Raised by emit() once the client has gone away."""
+
+
+class BodyTooLarge(Exception):
+    """Raised by read_body() past ASGI_MAX_BODY."""
+
+
+def dispatch(environ, emit):
+    """
+    Runs one request through Flask on a pool thread, passing the ASGI
+    response messages to emit() as they are produced. The request context
+    stays on this thread until the body (or stream) is exhausted. If emit()
+    raises ClientDisconnected the response is closed at once, which stops a
+    streaming view from rendering the rest of its body.
+    """
+    started = False
+    ctx = flask_app.request_context(environ)
+    error = None
+    try:
+        # Same steps as Flask.wsgi_app, so errors get the usual 500 page and
+        # teardown handlers run exactly as they do under Gunicorn.
+        try:
+            ctx.push()
+            response = flask_app.full_dispatch_request()
+        except Exception as e:
+            error = e
+            response = flask_app.handle_exception(e)
+        try:
+            emit({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in response.headers.items()],
+            })
+            started = True
+            if environ['REQUEST_METHOD'] != 'HEAD':
+                for chunk in response.iter_encoded():
+                    if chunk:
+                        emit({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            response.close()
+            ctx.pop(error)
+        emit({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    except ClientDisconnected:
+        pass  # Nobody is listening; the response was closed above.
+    except Exception as e:
+        flask_app.logger.exception(f'ASGI dispatch failed: {e}')
+        if not started:
+            try:
+                emit({'type': 'http.response.start', 'status': 500,
+                      'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+                emit({'type': 'http.response.body', 'body': b'Internal Server Error', 'more_body': False})
+            except ClientDisconnected:
+                pass
+        raise
+    finally:
+        emit(None)
+
+
+async def read_body(receive):
+    """
+    Returns the request body, or None if the client disconnected before
+    sending all of it. Raises BodyTooLarge past ASGI_MAX_BODY.
+    """
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > ASGI_MAX_BODY:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    try:
+        body = await read_body(receive)
+    except BodyTooLarge:
+        await send({'type': 'http.response.start', 'status': 413,
+                    'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+        await send({'type': 'http.response.body', 'body': b'Request body too large'})
+        return
+    if body is None:
+        return  # The client gave up before the request was complete.
+
+    loop = asyncio.get_running_loop()
+    # A few chunks of slack; the pool thread waits when the client reads slowly.
+    messages = asyncio.Queue(maxsize=8)
+    disconnected = threading.Event()
+
+    def emit(message):
+        # None (the end marker) always goes through so the loop below finishes.
+        if message is not None and disconnected.is_set():
+            raise ClientDisconnected()
+        asyncio.run_coroutine_threadsafe(messages.put(message), loop).result()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    task = loop.run_in_executor(executor, dispatch, wsgi_environ(scope, body), emit)
+    try:
+        # After a disconnect, keep draining so a blocked emit() returns and
+        # the pool thread notices on its next message.
+        while True:
+            message = await messages.get()
+            if message is None:
+                break
+            if disconnected.is_set():
+                continue
+            try:
+                await send(message)
+            except Exception:  # Servers differ in what a send to a closed connection raises.
+                disconnected.set()
+    finally:
+        watcher.cancel()
+    try:
+        await task
+    except Exception:
+        pass  # Already logged and answered with a 500 (or cut short) in dispatch().
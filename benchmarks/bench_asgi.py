@@ -0,0 +1,229 @@
+"""
+Compares the Gunicorn (WSGI) deployment of server.py with the ASGI serving
+mode in asgi_server.py under a typeahead-style load.
+
+    python benchmarks/bench_asgi.py [data_dir] [connections] [seconds] [idle_connections]
+
+data_dir must hold a courses/ directory with at least one *_final.json term
+(the repository root by default). For each server:
+- `gunicorn -w GUNICORN_WORKERS server:app` (sync workers, as deployed), then
+- `uvicorn asgi_server:app` (one process, ASGI_THREADS pool threads)
+is started from data_dir and driven by an asyncio HTTP/1.1 client:
+- throughput: `connections` clients each POST /api/get_courses typeahead
+  queries (growing prefixes of real codes and title words) back to back over
+  keep-alive connections for `seconds`; reports req/s and p50/p99 latency
+- idle: `idle_connections` connections are opened and left idle, then 50
+  requests are sent on fresh connections; reports how many were answered
+  within 5 s and their p50 latency
+- RSS of the whole server process tree after the runs
+"""
+import asyncio
+import glob
+import json
+import os
+import random
+import re
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+HOST = '127.0.0.1'
+GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', 4))
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'server exited with {proc.returncode}')
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def tree_rss_mib(pid):
+    """Sum of VmRSS over pid and all its descendants."""
+    total = 0
+    pending = [pid]
+    while pending:
+        p = pending.pop()
+        try:
+            with open(f'/proc/{p}/status') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+            for task in os.listdir(f'/proc/{p}/task'):
+                with open(f'/proc/{p}/task/{task}/children') as f:
+                    pending.extend(int(c) for c in f.read().split())
+        except (OSError, StopIteration):
+            pass
+    return total / 1024
+
+
+def typeahead_queries(data_dir):
+    """
+    Request bodies for /api/get_courses: each prefix a user would type on the
+    way to a course code or a title word of the first term found.
+    """
+    path = sorted(glob.glob(os.path.join(data_dir, 'courses', '*_final.json')))[0]
+    year, term = re.match(r'.*_(\d+)_(\w+)_final\.json$', path).groups()
+    with open(path) as f:
+        courses = json.load(f)
+    rng = random.Random(0)
+    targets = [course['code'] for course in rng.sample(courses, min(200, len(courses)))]
+    targets += [word for course in rng.sample(courses, min(200, len(courses)))
+                for word in course['name'].split()[:1] if len(word) > 3]
+    bodies = []
+    for target in targets:
+        for i in range(2, len(target) + 1):
+            bodies.append(json.dumps({'searchTerm': target[:i], 'itemsPerPage': 20, 'startFrom': 0,
+                                      'year': year, 'term': term}).encode())
+    rng.shuffle(bodies)
+    return bodies
+
+
+class Client:
+    """Minimal keep-alive HTTP/1.1 client; reconnects when the server closes."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def post(self, path, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(HOST, self.port)
+        self.writer.write(
+            f'POST {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1])
+        headers = {k.lower(): v.strip() for k, _, v in (line.partition(':') for line in lines[1:] if line)}
+        if 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def throughput(port, bodies, connections, seconds):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def run(offset):
+        nonlocal errors
+        client = Client(port)
+        i = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await client.post('/api/get_courses', bodies[i % len(bodies)])
+            except (OSError, asyncio.IncompleteReadError):
+                client.close()
+                status = None
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+            i += connections
+        client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(i) for i in range(connections)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def idle_then_requests(port, bodies, idle):
+    held = []
+    for _ in range(idle):
+        try:
+            held.append(await asyncio.open_connection(HOST, port))
+        except OSError:
+            break
+    await asyncio.sleep(1)
+
+    async def one(body):
+        started = time.perf_counter()
+        client = Client(port)
+        try:
+            status = await asyncio.wait_for(client.post('/api/get_courses', body), 5)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            status = None
+        client.close()
+        return time.perf_counter() - started if status == 200 else None
+
+    results = await asyncio.gather(*(one(body) for body in bodies[:50]))
+    for _, writer in held:
+        writer.close()
+    return len(held), [r for r in results if r is not None]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1e3 if values else float('nan')
+
+
+def bench(label, command, data_dir, bodies, connections, seconds, idle):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=REPO + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    proc = subprocess.Popen(command(port), cwd=data_dir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port, proc)
+        asyncio.run(throughput(port, bodies, 4, 2))  # warm up pools and caches
+        latencies, errors, elapsed = asyncio.run(throughput(port, bodies, connections, seconds))
+        held, answered = asyncio.run(idle_then_requests(port, bodies, idle))
+        rss = tree_rss_mib(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait()
+    print(f'{label:<24} {len(latencies) / elapsed:8.0f} req/s  p50 {percentile(latencies, 0.5):6.1f} ms  '
+          f'p99 {percentile(latencies, 0.99):7.1f} ms  errors {errors:4d}  | '
+          f'{held} idle: {len(answered):2d}/50 answered, p50 {percentile(answered, 0.5):7.1f} ms  | '
+          f'RSS {rss:6.1f} MiB')
+
+
+if __name__ == '__main__':
+    data_dir = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else REPO
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    idle = int(sys.argv[4]) if len(sys.argv) > 4 else 2000
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    bodies = typeahead_queries(data_dir)
+    print(f'{len(bodies)} typeahead queries, {connections} connections for {seconds:.0f} s, '
+          f'{idle} idle connections')
+    bench(f'gunicorn -w {GUNICORN_WORKERS} (sync)',
+          lambda port: [sys.executable, '-m', 'gunicorn', '-w', str(GUNICORN_WORKERS),
+                        '--bind', f'{HOST}:{port}', 'server:app'],
+          data_dir, bodies, connections, seconds, idle)
+    bench('uvicorn asgi_server',
+          lambda port: [sys.executable, '-m', 'uvicorn', 'asgi_server:app', '--host', HOST, '--port', str(port),
+                        '--log-level', 'warning', '--no-access-log'],
+          data_dir, bodies, connections, seconds, idle)
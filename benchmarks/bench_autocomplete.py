@@ -0,0 +1,55 @@
+"""
+Compares /api/autocomplete's in-memory trie with the FTS5 search behind
+/api/get_courses on the same prefixes.
+
+    python benchmarks/bench_autocomplete.py [year term] [iterations]
+
+Run from the directory that holds courses/ (the server loads it on import).
+Prefixes are taken from the loaded term: department codes, partial course
+numbers and the first letters of course names.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server  # noqa: E402
+
+
+def sample_prefixes(codes, names):
+    prefixes = set()
+    for code in codes[::7]:
+        prefixes.update([code[:2], code[:3], code[:4], code[:3] + ' ' + code[3:5]])
+    for name in names[::11]:
+        prefixes.update([name[:3].lower(), name[:5].lower()])
+    return sorted(p.strip() for p in prefixes if p.strip())
+
+
+def timed(label, fn, prefixes, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for prefix in prefixes:
+            fn(prefix)
+    elapsed = time.perf_counter() - started
+    lookups = iterations * len(prefixes)
+    print(f'{label:<22} {elapsed / lookups * 1e6:9.1f} us/lookup   {lookups / elapsed:10.0f} lookups/s')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3:
+        key = (sys.argv[1], sys.argv[2])
+    else:
+        key = next(iter(server.autocomplete_map), None)
+    if key not in server.autocomplete_map:
+        sys.exit('No term loaded; run from the directory containing courses/')
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    conn = server.get_connection(server.db_name_for(*key))
+    rows = conn.execute('SELECT code, name FROM courses_fts;').fetchall()
+    prefixes = sample_prefixes([row[0] for row in rows], [row[1] or '' for row in rows])
+    trie = server.autocomplete_map[key][0]
+    print(f'{key[0]} {key[1]}: {len(rows)} courses, {len(prefixes)} prefixes, {iterations} iterations')
+
+    timed('FTS5 MATCH + bm25', lambda prefix: server.run_search(conn, prefix, 10, 0), prefixes, iterations)
+    timed('trie', lambda prefix: trie.find(prefix.lower(), 10), prefixes, iterations)
+    conn.close()
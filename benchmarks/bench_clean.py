@@ -0,0 +1,112 @@
+"""
+Times the scraper's cleaning stage (UFCourseGrabber.alphabeticalNoDuplicates)
+against the previous implementation on a synthetic full-term dump.
+
+    python benchmarks/bench_clean.py [courses] [duplicate_rate]
+
+Writes a merged NDJSON dump of `courses` courses (50 per page, with
+duplicate_rate of them repeated on later pages, as the API does across
+overlapping pages) and cleans it once per implementation, each in its own
+subprocess so peak RSS can be reported separately. Both outputs are checked
+to hold the same courses.
+"""
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pythonScripts'))
+
+
+def previous_clean(directory):
+    """alphabeticalNoDuplicates before the streaming rewrite."""
+    def convert_to_24_hour(time_str):
+        return datetime.strptime(time_str, '%I:%M %p').strftime('%H:%M')
+
+    with open(directory) as file:
+        data = [json.loads(line) for line in file if line.strip()]
+
+    all_courses = []
+    for item in data:
+        all_courses.extend(item.get('COURSES', []))
+
+    unique_courses_set = set()
+    for course in all_courses:
+        unique_courses_set.add(json.dumps(course, sort_keys=True))
+    unique_courses = [json.loads(course) for course in unique_courses_set]
+    unique_courses.sort(key=lambda x: (x['code'], x['name'], x['termInd']))
+
+    file_name = os.path.splitext(os.path.basename(directory))[0]
+    output_file_name = os.path.join('courses/', file_name + '_clean.json')
+    for course in unique_courses:
+        course['codeWithSpace'] = course['code'][:3] + ' ' + course['code'][3:]
+        for section in course['sections']:
+            del section['EEP']
+            del section['LMS']
+            del section['acadCareer']
+            del section['addEligible']
+            del section['dNote']
+            section['courseCode'] = course['code']
+            for meetTime in section['meetTimes']:
+                meetTime['meetTimeBegin'] = convert_to_24_hour(meetTime['meetTimeBegin'])
+                meetTime['meetTimeEnd'] = convert_to_24_hour(meetTime['meetTimeEnd'])
+    with open(output_file_name, 'w') as file:
+        json.dump(unique_courses, file, indent=4)
+
+
+def write_dump(path, num_courses, duplicate_rate, rng):
+    from fake_soc_api import PAGE_SIZE, fake_course
+
+    rows = list(range(num_courses))
+    rows += rng.sample(rows, int(num_courses * duplicate_rate))
+    with open(path, 'w') as f:
+        for i in range(0, len(rows), PAGE_SIZE):
+            page = {'COURSES': [fake_course(row) for row in rows[i:i + PAGE_SIZE]]}
+            f.write(json.dumps(page, separators=(',', ':')) + '\n')
+
+
+def run_one(which, path):
+    """Runs in a child process: cleans path and prints seconds and peak RSS."""
+    os.chdir(os.path.dirname(path))
+    os.makedirs('courses', exist_ok=True)
+    if which == 'streaming':
+        import UFCourseGrabber  # noqa: F401  (imported here so setup is outside the timing)
+    started = time.perf_counter()
+    if which == 'streaming':
+        UFCourseGrabber.alphabeticalNoDuplicates(path)
+    else:
+        previous_clean(path)
+    elapsed = time.perf_counter() - started
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'seconds': elapsed, 'peak_mib': peak_kib / 1024}))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--run']:
+        run_one(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    num_courses = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    duplicate_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+
+    work = tempfile.mkdtemp()
+    outputs = {}
+    print(f'{num_courses} courses, {duplicate_rate:.0%} duplicated')
+    for which in ('previous', 'streaming'):
+        run_dir = os.path.join(work, which)
+        os.makedirs(run_dir)
+        dump = os.path.join(run_dir, 'UF_Jan-01-2099_99_fall.ndjson')
+        write_dump(dump, num_courses, duplicate_rate, random.Random(0))
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), '--run', which, dump],
+                                capture_output=True, text=True, check=True)
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        with open(os.path.join(run_dir, 'courses', 'UF_Jan-01-2099_99_fall_clean.json')) as f:
+            outputs[which] = json.load(f)
+        print(f'{which:<10} {stats["seconds"] * 1e3:9.1f} ms  peak RSS {stats["peak_mib"]:7.1f} MiB')
+    print('outputs match' if outputs['previous'] == outputs['streaming'] else 'OUTPUTS DIFFER')
@@ -0,0 +1,76 @@
+"""
+Latency and recall of the fuzzy search index on typical and misspelled queries.
+
+    python benchmarks/bench_fuzzy_search.py [year term] [num_queries]
+
+Run from the directory that holds courses/ (the server loads it on import).
+Queries are built from the loaded term's codes and name words; misspelled
+variants get one deleted, substituted or transposed character. Recall@10 is
+the share of queries whose source course is in the top 10. The FTS5 route is
+shown for comparison.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server  # noqa: E402
+
+
+def misspell(word, rng):
+    i = rng.randrange(len(word))
+    kind = rng.choice(['delete', 'substitute', 'transpose'])
+    if kind == 'delete' and len(word) > 3:
+        return word[:i] + word[i + 1:]
+    if kind == 'transpose' and i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i + 1:]
+
+
+def build_queries(rows, num_queries, rng):
+    typical, misspelled = [], []
+    for code, name in rng.sample(rows, min(num_queries, len(rows))):
+        words = [w for w in (name or '').lower().split() if len(w) >= 5] or [code.lower()]
+        word = rng.choice(words + [code.lower()])
+        typical.append((word, code))
+        misspelled.append((misspell(word, rng), code))
+    return typical, misspelled
+
+
+def report(label, search, queries):
+    latencies = []
+    hits = 0
+    for query, code in queries:
+        started = time.perf_counter()
+        results = search(query)
+        latencies.append(time.perf_counter() - started)
+        hits += code in results
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e3
+    p95 = latencies[int(len(latencies) * 0.95)] * 1e3
+    print(f'{label:<28} p50 {p50:7.3f} ms   p95 {p95:7.3f} ms   recall@10 {hits / len(queries):6.1%}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3:
+        key = (sys.argv[1], sys.argv[2])
+    else:
+        key = next(iter(server.fuzzy_index_map), None)
+    if key not in server.fuzzy_index_map:
+        sys.exit('No term loaded; run from the directory containing courses/')
+    num_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+
+    conn = server.get_connection(server.db_name_for(*key))
+    rows = conn.execute('SELECT code, name FROM courses_fts;').fetchall()
+    typical, misspelled = build_queries(rows, num_queries, random.Random(0))
+    index = server.fuzzy_index_map[key]
+    print(f'{key[0]} {key[1]}: {len(rows)} courses, {len(index.tokens)} tokens, {len(typical)} queries each')
+
+    fuzzy = lambda query: index.search(query, 10, server.FUZZY_BUDGET_MS)  # noqa: E731
+    fts = lambda query: server.run_search(conn, query, 10, 0)  # noqa: E731
+    report('fuzzy, typical', fuzzy, typical)
+    report('fuzzy, misspelled', fuzzy, misspelled)
+    report('FTS5, typical', fts, typical)
+    report('FTS5, misspelled', fts, misspelled)
+    conn.close()
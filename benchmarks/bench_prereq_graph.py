@@ -0,0 +1,81 @@
+"""
+Compares the old networkx path of /generate_a_list with GraphModule.PrereqGraph.
+
+    python benchmarks/bench_prereq_graph.py [num_courses] [iterations]
+
+Builds a synthetic department with random prerequisite edges and times, per
+simulated request, building the graph and producing the Cytoscape payload.
+Also reports peak traced memory for a single request.
+"""
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import networkx as nx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from GraphModule import CodeTable, PrereqGraph  # noqa: E402
+
+
+def synthetic_edges(num_courses):
+    random.seed(0)
+    codes = [f'COP\n{1000 + i}' for i in range(num_courses)]
+    edges = {}
+    for code in codes:
+        for prereq in random.sample(codes, random.randint(0, 3)):
+            if prereq != code:
+                edges[(prereq, code)] = None
+    return list(edges)
+
+
+def networkx_request(edges, taken):
+    G = nx.DiGraph()
+    for course in taken:
+        G.add_node(course)
+    for source, target in edges:
+        G.add_edge(source, target)
+    nodes = [
+        {"data": {"id": node}, "classes": "selected" if node in taken else "not_selected"}
+        for node in G.nodes()
+    ]
+    edge_list = [{"data": {"source": edge[0], "target": edge[1]}} for edge in G.edges()]
+    return json.dumps({'nodes': nodes, 'edges': edge_list}, sort_keys=True, separators=(',', ':'))
+
+
+def array_request(graph, taken):
+    return graph.cytoscape_json(taken)
+
+
+def timed(label, fn, iterations):
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call = (time.perf_counter() - started) / iterations
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<32} {per_call * 1e3:8.3f} ms/request   peak {peak / 1024:8.1f} KiB')
+
+
+if __name__ == '__main__':
+    num_courses = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    edges = synthetic_edges(num_courses)
+    taken = ['COP\n1000', 'COP\n1001', 'COP\n1002']
+    print(f'{num_courses} courses, {len(edges)} edges, {iterations} iterations')
+
+    table = CodeTable()
+    id_edges = [(table.intern(source), table.intern(target)) for source, target in edges]
+    cached = PrereqGraph(table, id_edges)
+
+    assert json.loads(array_request(cached, taken))['nodes'] == json.loads(networkx_request(edges, taken))['nodes']
+
+    timed('networkx DiGraph', lambda: networkx_request(edges, taken), iterations)
+    timed('PrereqGraph (built per request)', lambda: array_request(PrereqGraph(table, id_edges), taken), iterations)
+    timed('PrereqGraph (cached per major)', lambda: array_request(cached, taken), iterations)
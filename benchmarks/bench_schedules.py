@@ -0,0 +1,86 @@
+"""
+Times ScheduleModule.ScheduleBuilder against a brute-force enumeration.
+
+    python benchmarks/bench_schedules.py [num_courses] [sections_per_course] [limit]
+
+Generates large synthetic courses (UF-style periods on MWF/TR/MW patterns)
+and reports how long each approach takes to enumerate every conflict-free
+schedule, or the first `limit` of them. Brute force walks itertools.product
+and checks every pair of sections for overlapping meeting times.
+"""
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ScheduleModule import ScheduleBuilder  # noqa: E402
+
+PERIODS = ['07:25', '08:30', '09:35', '10:40', '11:45', '12:50', '13:55', '15:00', '16:05', '17:10', '18:15']
+PATTERNS = [['M', 'W', 'F'], ['T', 'R'], ['M', 'W'], ['T'], ['R'], ['F']]
+
+
+def minutes(time_str):
+    hours, mins = time_str.split(':')
+    return int(hours) * 60 + int(mins)
+
+
+def clock(total):
+    return f'{total // 60:02d}:{total % 60:02d}'
+
+
+def synthetic_courses(num_courses, sections_per_course, rng):
+    courses = []
+    for c in range(num_courses):
+        sections = []
+        for s in range(sections_per_course):
+            meet_times = []
+            for _ in range(rng.choice([1, 1, 2])):
+                begin = minutes(rng.choice(PERIODS))
+                length = rng.choice([50, 50, 75, 115])
+                meet_times.append({
+                    'meetDays': rng.choice(PATTERNS),
+                    'meetTimeBegin': clock(begin),
+                    'meetTimeEnd': clock(begin + length),
+                })
+            sections.append({'classNumber': c * 1000 + s, 'meetTimes': meet_times})
+        courses.append((f'CRS{1000 + c}', sections))
+    return courses
+
+
+def brute_force(courses, limit):
+    def overlaps(a, b):
+        for x in a['meetTimes']:
+            for y in b['meetTimes']:
+                if set(x['meetDays']) & set(y['meetDays']) and \
+                        minutes(x['meetTimeBegin']) < minutes(y['meetTimeEnd']) and \
+                        minutes(y['meetTimeBegin']) < minutes(x['meetTimeEnd']):
+                    return True
+        return False
+
+    found = 0
+    for combo in itertools.product(*[sections for _, sections in courses]):
+        if all(not overlaps(a, b) for a, b in itertools.combinations(combo, 2)):
+            found += 1
+            if found >= limit:
+                break
+    return found
+
+
+def bitmask(courses, limit):
+    return sum(1 for _ in ScheduleBuilder(courses).schedules(limit))
+
+
+if __name__ == '__main__':
+    num_courses = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    sections_per_course = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    limit = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+
+    courses = synthetic_courses(num_courses, sections_per_course, random.Random(0))
+    print(f'{num_courses} courses x {sections_per_course} sections, limit {limit}')
+    for label, fn in (('bitmask backtracking', bitmask), ('brute force', brute_force)):
+        started = time.perf_counter()
+        found = fn(courses, limit)
+        elapsed = time.perf_counter() - started
+        print(f'{label:<22} {found:6d} schedules in {elapsed * 1e3:9.1f} ms')
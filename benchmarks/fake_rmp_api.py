@@ -0,0 +1,136 @@
+"""
+Local stand-in for the RateMyProfessors GraphQL endpoint, and a harness that
+runs pythonScripts/scrapeRMP.py against it.
+
+    python benchmarks/fake_rmp_api.py [professors] [latency_ms] [rate_limit_rate]
+    python benchmarks/fake_rmp_api.py serve [port] [latency_ms] [rate_limit_rate]
+
+The stub answers NewSearchTeachersQuery POSTs with one teacher edge whose
+first and last name match the searched text, for two names out of three;
+the rest get no edges ("not found"). Each request sleeps latency_ms and is
+answered 429 at rate_limit_rate.
+
+The harness builds a scratch tree holding a course file taught by
+`professors` instructors. It runs scrapeRMP.main() three times, reporting the
+requests and time each run took:
+- a cold run with no cache
+- a warm run, which should send no requests
+- a run after a third of the entries have expired and 20 new instructors appear
+"""
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pythonScripts'))
+import scrapeRMP  # noqa: E402
+
+
+def teacher_node(name):
+    digest = int(hashlib.sha1(name.encode()).hexdigest(), 16)
+    if digest % 3 == 0:
+        return None
+    first, last = name.split(' ', 1)
+    return {
+        'id': f'T{digest % 100000}', 'legacyId': digest % 1000000,
+        'firstName': first, 'lastName': last,
+        'numRatings': 1 + digest % 50,
+        'avgRatingRounded': round(1 + (digest % 40) / 10, 1),
+        'avgDifficultyRounded': round(1 + (digest // 7 % 40) / 10, 1),
+    }
+
+
+def make_server(port=0, latency_ms=5.0, rate_limit_rate=0.0):
+    stats = {'requests': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with lock:
+                stats['requests'] += 1
+            time.sleep(latency_ms / 1000)
+            if random.random() < rate_limit_rate:
+                payload, status = b'', 429
+            else:
+                node = teacher_node(body['variables']['query']['text'])
+                edges = [{'cursor': 'c', 'node': node}] if node else []
+                payload = json.dumps({'data': {'newSearch': {'teachers': {'didFallback': False, 'edges': edges}}}}).encode()
+                status = 200
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    server.stats = stats
+    return server
+
+
+def write_course_file(names):
+    sections = [{'instructors': [{'name': name}]} for name in names]
+    with open('courses/UF_Jan-01-2099_99_fall_final.json', 'w') as f:
+        json.dump([{'code': 'TST1000', 'sections': sections}], f)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['serve']:
+        args = sys.argv[2:]
+        port = int(args[0]) if len(args) > 0 else 8766
+        server = make_server(port, float(args[1]) if len(args) > 1 else 5.0, float(args[2]) if len(args) > 2 else 0.0)
+        print(f'Fake RMP GraphQL on http://127.0.0.1:{port}/graphql')
+        server.serve_forever()
+
+    professors = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    rate_limit_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.02
+
+    server = make_server(0, latency_ms, rate_limit_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scrapeRMP.url = f'http://127.0.0.1:{server.server_address[1]}/graphql'
+    scrapeRMP.RMP_BACKOFF = 0.05
+
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('courses')
+    os.makedirs('pythonScripts')
+    names = [f'Instructor{i} Person{i % 37}' for i in range(professors)]
+    write_course_file(names)
+
+    def run(label):
+        before = server.stats['requests']
+        started = time.perf_counter()
+        scrapeRMP.main()
+        elapsed = time.perf_counter() - started
+        results.append(f'{label:<28} {server.stats["requests"] - before:5d} requests in {elapsed:6.2f} s')
+
+    results = []
+    sys.stdout = open(os.devnull, 'w')
+    run('cold (no cache)')
+    run('warm')
+    with open(scrapeRMP.CACHE_FILE) as f:
+        cache = json.load(f)
+    for name in random.Random(0).sample(sorted(cache), len(cache) // 3):
+        cache[name]['expiresAt'] = 0
+    with open(scrapeRMP.CACHE_FILE, 'w') as f:
+        json.dump(cache, f)
+    write_course_file(names + [f'Newhire{i} Person{i}' for i in range(20)])
+    run('1/3 expired + 20 new')
+    sys.stdout = sys.__stdout__
+
+    print(f'{professors} professors, {latency_ms:.0f} ms latency, {rate_limit_rate:.0%} 429s, '
+          f'concurrency {scrapeRMP.RMP_CONCURRENCY}')
+    for line in results:
+        print(line)
+    server.shutdown()
@@ -0,0 +1,167 @@
+"""
+Local stand-in for the UF schedule-of-courses API, and a pages/sec benchmark
+for pythonScripts/UFCourseGrabber.py.
+
+    python benchmarks/fake_soc_api.py [pages] [latency_ms] [fail_rate] [concurrency ...]
+    python benchmarks/fake_soc_api.py serve [port] [pages] [latency_ms] [fail_rate]
+
+The fake API answers `?term=...&last-control-number=N` with the same shape as
+the real one: a one-element list holding COURSES, LASTCONTROLNUMBER,
+RETRIEVEDROWS and TOTALROWS, with RETRIEVEDROWS 0 past the last page. Each
+request sleeps latency_ms (every 20th page is 10x slower) and fails with a 503
+at fail_rate, so retries and uneven pages are exercised.
+
+The benchmark scrapes the whole listing once the old way (fixed strides, one
+requests.get per page, no keep-alive) and then with scrape_term() at each
+concurrency level, writing into a temporary courses directory.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pythonScripts'))
+import UFCourseGrabber  # noqa: E402
+
+PAGE_SIZE = UFCourseGrabber.PAGE_SIZE
+DEPTS = ['COP', 'CDA', 'MAC', 'MAS', 'PHY', 'CHM', 'ENC', 'STA', 'EEL', 'BSC']
+TIMES = ['7:25 AM', '8:30 AM', '9:35 AM', '10:40 AM', '11:45 AM', '12:50 PM', '1:55 PM', '3:00 PM', '4:05 PM']
+
+
+def fake_course(row):
+    rng = random.Random(row)
+    code = f'{DEPTS[row % len(DEPTS)]}{1000 + row // len(DEPTS)}'
+    sections = []
+    for s in range(rng.randint(1, 4)):
+        begin = rng.randrange(len(TIMES) - 1)
+        sections.append({
+            'EEP': 'N', 'LMS': 'Canvas', 'acadCareer': 'UGRD', 'addEligible': 'Y', 'dNote': '',
+            'classNumber': row * 10 + s,
+            'credits': rng.choice([1, 3, 4]),
+            'instructors': [{'name': f'Instructor {rng.randint(1, 400)}'}],
+            'meetTimes': [{
+                'meetDays': rng.choice([['M', 'W', 'F'], ['T', 'R']]),
+                'meetTimeBegin': TIMES[begin],
+                'meetTimeEnd': TIMES[begin + 1],
+            }],
+        })
+    return {'code': code, 'name': f'Course {row}', 'termInd': ' ', 'prerequisites': '',
+            'description': 'Synthetic course.', 'sections': sections}
+
+
+def page_body(control_num, total_rows):
+    rows = range(control_num, min(control_num + PAGE_SIZE, total_rows))
+    return json.dumps([{
+        'COURSES': [fake_course(row) for row in rows],
+        'LASTCONTROLNUMBER': control_num + len(rows),
+        'RETRIEVEDROWS': len(rows),
+        'TOTALROWS': total_rows,
+    }]).encode()
+
+
+def make_server(port=0, pages=100, latency_ms=20.0, fail_rate=0.0):
+    total_rows = pages * PAGE_SIZE
+    bodies = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            control_num = int(query.get('last-control-number', ['0'])[0] or 0)
+            delay = latency_ms * (10 if (control_num // PAGE_SIZE) % 20 == 19 else 1)
+            time.sleep(delay / 1000)
+            if random.random() < fail_rate:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            with lock:
+                body = bodies.get(control_num)
+                if body is None:
+                    body = bodies[control_num] = page_body(control_num, total_rows)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def fixed_strides(url, threads=16):
+    """The previous scraper loop: fixed strides, no session, no backoff."""
+    pages = []
+
+    def handler(thread_id, control_num):
+        while True:
+            response = requests.get(url + str(control_num))
+            data = response.json() if response.ok else None
+            if data is not None and (not data or data[0]['RETRIEVEDROWS'] == 0):
+                return
+            if data is not None:
+                UFCourseGrabber.save_text_to_json_file(data, f'strides_thread{thread_id}.json')
+                pages.append(control_num)
+                control_num += PAGE_SIZE * threads
+
+    workers = [threading.Thread(target=handler, args=(i, PAGE_SIZE * i)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return len(pages)
+
+
+def pooled(url, concurrency):
+    UFCourseGrabber.counter.value = 0
+    UFCourseGrabber.scrape_term(url, 'fall', 99, concurrency)
+    return UFCourseGrabber.counter.value
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['serve']:
+        args = sys.argv[2:]
+        port = int(args[0]) if len(args) > 0 else 8765
+        server = make_server(port, int(args[1]) if len(args) > 1 else 100,
+                             float(args[2]) if len(args) > 2 else 20.0,
+                             float(args[3]) if len(args) > 3 else 0.0)
+        print(f'Fake SOC API on http://127.0.0.1:{port}/apix/soc/schedule/')
+        server.serve_forever()
+
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    fail_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    levels = [int(arg) for arg in sys.argv[4:]] or [4, 16, 32]
+
+    logging.getLogger().setLevel(logging.ERROR)
+    UFCourseGrabber.SCRAPER_BACKOFF = 0.05
+
+    server = make_server(0, pages, latency_ms, fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/apix/soc/schedule/?category=RES&term=2998&last-control-number='
+    requests.get(url + '0')  # build the first page before timing
+
+    print(f'{pages} pages, {latency_ms:.0f} ms latency, {fail_rate:.0%} 503s')
+    runs = [('fixed strides x16', lambda: fixed_strides(url))]
+    runs += [(f'pooled queue x{n}', lambda n=n: pooled(url, n)) for n in levels]
+    for label, fn in runs:
+        UFCourseGrabber.courses_dir = tempfile.mkdtemp()
+        started = time.perf_counter()
+        fetched = fn()
+        elapsed = time.perf_counter() - started
+        print(f'{label:<20} {fetched:5d} pages in {elapsed:6.2f} s  {fetched / elapsed:8.1f} pages/s')
+    server.shutdown()
@@ -6,6 +6,11 @@ from datetime import date
 import threading
 import logging
 import glob
+import hashlib
+import shutil
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Set up logging
@@ -20,6 +25,10 @@ courses_dir = os.path.join(parent_dir, 'courses')
 if not os.path.exists(courses_dir):
     os.makedirs(courses_dir)
 
+# Fingerprint indexes and changesets for --delta runs live in a subdirectory,
+# out of the way of the courses/*.json globs used by scrapeRMP and the server.
+delta_dir = os.path.join(courses_dir, 'delta')
+
 class Counter:
     def __init__(self):
         self.value = 0
@@ -31,97 +40,163 @@ class Counter:
 
 counter = Counter()
 
-def scrape_page(url):
-    try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raises stored HTTPError, if one occurred.
-    except requests.HTTPError as http_err:
-        logging.error(f'HTTP error occurred: {http_err}')
-        os._exit(1)
-        return []
-    except Exception as err:
-        logging.error(f'Other error occurred: {err}')
-        os._exit(1)
-        return []
+# Number of pages fetched at once, and how hard to retry a failing page.
+SCRAPER_CONCURRENCY = int(os.environ.get('SCRAPER_CONCURRENCY', 16))
+SCRAPER_RETRIES = int(os.environ.get('SCRAPER_RETRIES', 5))
+SCRAPER_BACKOFF = float(os.environ.get('SCRAPER_BACKOFF', 1.0))
+SCRAPER_TIMEOUT = float(os.environ.get('SCRAPER_TIMEOUT', 30))
 
-    try:
-        data = response.json()
-    except ValueError:  # includes simplejson.decoder.JSONDecodeError
-        logging.error('Decoding JSON has failed')
-        os._exit(1)
-        return []
-
-    if isinstance(data, list):  # Changed this to list as you mentioned the type of data is list
-        return data
-    else:
-        logging.info("Data is not a list.")
-        os._exit(1)
-        return []  # Return an empty list if data is not a list
+# The API returns this many rows per last-control-number step.
+PAGE_SIZE = 50
+
+class ScrapeError(Exception):
+    pass
+
+class PageQueue:
+    """
+    Hands out control numbers in order to whichever worker is free, until a
+    page comes back empty (the end of the listing) or a worker fails.
+    """
+    def __init__(self):
+        self._next = 0
+        self._end = None
+        self._aborted = False
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self._aborted or (self._end is not None and self._next >= self._end):
+                return None
+            control_num = self._next
+            self._next += PAGE_SIZE
+            return control_num
+
+    def mark_end(self, control_num):
+        with self._lock:
+            if self._end is None or control_num < self._end:
+                self._end = control_num
+
+    def abort(self):
+        with self._lock:
+            self._aborted = True
+
+def new_session(pool_size=1):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def scrape_page(url, session=None, retries=None):
+    """
+    Fetches one page and returns its list of rows. Connection errors, timeouts,
+    429/5xx responses and undecodable bodies are retried with exponential
+    backoff and jitter; raises ScrapeError once retries are exhausted.
+    """
+    session = session or requests
+    retries = SCRAPER_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, timeout=SCRAPER_TIMEOUT)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise requests.HTTPError(f'{response.status_code} from {url}', response=response)
+            response.raise_for_status()  # Raises stored HTTPError, if one occurred.
+            data = response.json()
+        except requests.HTTPError as http_err:
+            status = http_err.response.status_code if http_err.response is not None else None
+            if status is not None and status != 429 and status < 500:
+                raise ScrapeError(f'HTTP error occurred: {http_err}')
+            error = f'HTTP error occurred: {http_err}'
+        except ValueError:  # includes simplejson.decoder.JSONDecodeError
+            error = 'Decoding JSON has failed'
+        except requests.RequestException as err:
+            error = f'Other error occurred: {err}'
+        else:
+            if isinstance(data, list):
+                return data
+            raise ScrapeError(f'Data is not a list: {url}')
+
+        if attempt == retries:
+            raise ScrapeError(f'{error} (gave up after {retries + 1} attempts)')
+        delay = SCRAPER_BACKOFF * (2 ** attempt) * (0.5 + random.random())
+        logging.warning(f'{error}; retrying in {delay:.1f}s')
+        time.sleep(delay)
 
 def save_text_to_json_file(text, filename):
+    """
+    Appends each item of a fetched page to the worker's NDJSON segment, one
+    JSON document per line, so the cost of a write never depends on how much
+    the segment already holds.
+    """
     filename = os.path.join(courses_dir, filename)  # Add 'courses' directory to the filename
-    
-    # Check if file exists
-    try:
-        if os.path.exists(filename):
-            # If it exists, open it and load the existing data
-            with open(filename, 'r') as f:
-                existing_data = json.load(f)
-        else:
-            # If it doesn't exist, create an empty list to hold the data
-            existing_data = []
-    except json.JSONDecodeError:
-        logging.error('Failed to decode JSON from file')
-        os._exit(1)
-        existing_data = []
 
     # Remove unwanted keys from the text
     keys_to_remove = ['LASTCONTROLNUMBER', 'TOTALROWS', 'RETRIEVEDROWS']
+    lines = []
     for item in text:
         for key in keys_to_remove:
             item.pop(key, None)
+        lines.append(json.dumps(item, separators=(',', ':')) + '\n')
 
-    # Add the new data to the existing data
-    existing_data.extend(text)
-
-    # Write the updated data to the file
     try:
-        with open(filename, 'w') as f:
-            json.dump(existing_data, f, indent=4)
-    except IOError:
-        logging.error('Failed to write to file')
-        os._exit(1)
-
-def thread_handler(thread_id, controlNum_start, url, term, year, increment=16):
-    filename = date.today().strftime("%b-%d-%Y") + f'_{year}_{term}_thread{thread_id}.json'
-    filename = os.path.join(courses_dir, filename)  # Add 'courses' directory to the filename
-
-    controlNum = controlNum_start
-    filename = date.today().strftime("%b-%d-%Y") + f'_{year}_{term}_thread{thread_id}.json'
-    while True:  # Infinite loop, we'll break it when no more data
-        full_url = url + str(controlNum)
-        logging.info(f'Thread-{thread_id}: {full_url}')
-        data = scrape_page(full_url)
-        if not data or data[0]['RETRIEVEDROWS'] == 0:  # If data is empty or RETRIEVEDROWS is 0, we assume there's no more data and break the loop
-            break
-
-        save_text_to_json_file(data, filename)
-        controlNum += 50 * increment
-        counter.increment()
+        with open(filename, 'a') as f:
+            f.writelines(lines)
+    except IOError as e:
+        raise ScrapeError(f'Failed to write to file {filename}: {e}')
+
+def worker(worker_id, queue, url, term, year):
+    """
+    Fetches pages from the shared queue over this worker's own keep-alive
+    session and appends them to the worker's thread file.
+    """
+    filename = date.today().strftime("%b-%d-%Y") + f'_{year}_{term}_thread{worker_id}.ndjson'
+    session = new_session()
+    try:
+        while True:
+            controlNum = queue.take()
+            if controlNum is None:
+                break
+            full_url = url + str(controlNum)
+            logging.info(f'Worker-{worker_id}: {full_url}')
+            data = scrape_page(full_url, session)
+            if not data or data[0]['RETRIEVEDROWS'] == 0:  # If data is empty or RETRIEVEDROWS is 0, we've passed the last page
+                queue.mark_end(controlNum)
+                continue
+
+            save_text_to_json_file(data, filename)
+            counter.increment()
+    except Exception:
+        queue.abort()
+        raise
+    finally:
+        session.close()
+
+def scrape_term(url, term, year, concurrency=None):
+    """
+    Scrapes every page of url with `concurrency` workers pulling control
+    numbers from a shared queue, so a slow page only delays its own worker.
+    Raises ScrapeError if any page fails for good.
+    """
+    concurrency = concurrency or SCRAPER_CONCURRENCY
+    queue = PageQueue()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(worker, i, queue, url, term, year) for i in range(concurrency)]
+        for future in futures:
+            future.result()
 
 def merge_json_files(term, year):
-    all_data = []
-    files = glob.glob(os.path.join(courses_dir, date.today().strftime("%b-%d-%Y") + f'_{year}_{term}_thread*.json'))
-
-    for file in files:
-        with open(file, 'r') as f:
-            data = json.load(f)
-            all_data.extend(data)
+    """
+    Concatenates the worker segments into one NDJSON file by copying bytes,
+    so merging never holds more than a buffer in memory. Returns its path.
+    """
+    files = sorted(glob.glob(os.path.join(courses_dir, date.today().strftime("%b-%d-%Y") + f'_{year}_{term}_thread*.ndjson')))
 
-    final_filename = 'UF_' + date.today().strftime("%b-%d-%Y") + f'_{year}_{term}.json'
+    final_filename = 'UF_' + date.today().strftime("%b-%d-%Y") + f'_{year}_{term}.ndjson'
     final_filename = os.path.join(courses_dir, final_filename)
-    with open(final_filename, 'w') as f:
-        json.dump(all_data, f, indent=4)
+    with open(final_filename, 'wb') as out:
+        for file in files:
+            with open(file, 'rb') as f:
+                shutil.copyfileobj(f, out)
 
     # Delete the individual thread files
     for file in files:
@@ -129,35 +204,83 @@ def merge_json_files(term, year):
             os.remove(file)
         except OSError as e:
             logging.error(f'Error while deleting file {file}. Error message: {e.strerror}')
-            os._exit(1)
+            sys.exit(1)
+
+    return final_filename
+
+def build_time_table():
+    """
+    Maps every 'H:MM AM' / 'HH:MM PM' string the API can send to 'HH:MM'.
+    """
+    table = {}
+    for hour in range(1, 13):
+        for minute in range(60):
+            for suffix, offset in (('AM', 0), ('PM', 12)):
+                converted = f'{hour % 12 + offset:02d}:{minute:02d}'
+                table[f'{hour}:{minute:02d} {suffix}'] = converted
+                table[f'{hour:02d}:{minute:02d} {suffix}'] = converted
+    return table
+
+TIME_24_HOUR = build_time_table()
+
+def iter_page_courses(path):
+    """
+    Yields every course in a merged NDJSON file, one page in memory at a time.
+    """
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                yield from json.loads(line).get('COURSES', [])
 
 def alphabeticalNoDuplicates(directory):
+    """
+    Streams the merged file, drops exact duplicate courses, normalizes each
+    new course as soon as it is seen and keeps only its serialized output,
+    then writes the sorted courses out one at a time.
+
+    Duplicates are detected by a SHA-1 of the course's canonical JSON, so
+    only 20 bytes per course are held for the check. Output is byte-for-byte
+    what the previous load/sort/json.dump implementation wrote. Returns the
+    path of the written *_clean.json.
+    """
     # Helper function to convert time to 24-hour format
     def convert_to_24_hour(time_str):
-        return datetime.strptime(time_str, '%I:%M %p').strftime('%H:%M')
-
-    # Read the JSON file
-    with open(directory) as file:
-        data = json.load(file)
-
-    # Initialize the array to store all courses
-    all_courses = []
-
-    # Iterate over the data and extract courses
-    for item in data:
-        courses = item.get('COURSES', [])
-        all_courses.extend(courses)
-
-    # Remove duplicate courses
-    unique_courses_set = set()
-    for course in all_courses:
-        unique_courses_set.add(json.dumps(course, sort_keys=True))
+        converted = TIME_24_HOUR.get(time_str)
+        if converted is None:
+            converted = datetime.strptime(time_str, '%I:%M %p').strftime('%H:%M')
+        return converted
+
+    seen_hashes = set()
+    unique_courses = []
+    for course in iter_page_courses(directory):
+        # Remove duplicate courses
+        canonical = json.dumps(course, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.sha1(canonical.encode()).digest()
+        if digest in seen_hashes:
+            continue
+        seen_hashes.add(digest)
+        # Reload from the canonical form so keys come out sorted, as they always have
+        course = json.loads(canonical)
+
+        # Convert meetTimeBegin and meetTimeEnd to 24-hour format
+        course['codeWithSpace'] = course['code'][:3] + ' ' + course['code'][3:]
+        for section in course['sections']:
+            del section['EEP']
+            del section['LMS']
+            del section['acadCareer']
+            del section['addEligible']
+            del section['dNote']
+            section['courseCode'] = course['code']
+            for meetTime in section['meetTimes']:
+                meetTime['meetTimeBegin'] = convert_to_24_hour(meetTime['meetTimeBegin'])
+                meetTime['meetTimeEnd'] = convert_to_24_hour(meetTime['meetTimeEnd'])
 
-    # Convert the set back to a list of dictionaries
-    unique_courses = [json.loads(course) for course in unique_courses_set]
+        # Keep the course as the text it will be written as, nested one level
+        sort_key = (course['code'], course['name'], course['termInd'])
+        unique_courses.append((sort_key, json.dumps(course, indent=4).replace('\n', '\n    ')))
 
     # Sort the courses
-    unique_courses.sort(key=lambda x: (x['code'], x['name'], x['termInd']))
+    unique_courses.sort()
 
     # Print the number of unique courses
     print(f"Number of unique courses: {len(unique_courses)}")
@@ -169,20 +292,6 @@ def alphabeticalNoDuplicates(directory):
     output_folder = 'courses/'
     output_file_name = os.path.join(output_folder, file_name + '_clean.json')
 
-    # Convert meetTimeBegin and meetTimeEnd to 24-hour format
-    for course in unique_courses:
-        course['codeWithSpace'] = course['code'][:3] + ' ' + course['code'][3:]
-        for section in course['sections']:
-            del section['EEP']
-            del section['LMS']
-            del section['acadCareer']
-            del section['addEligible']
-            del section['dNote']
-            section['courseCode'] = course['code']
-            for meetTime in section['meetTimes']:
-                meetTime['meetTimeBegin'] = convert_to_24_hour(meetTime['meetTimeBegin'])
-                meetTime['meetTimeEnd'] = convert_to_24_hour(meetTime['meetTimeEnd'])
-
     # # Load professor data
     # with open('RateMyProfessorData.json', 'r') as f:
     #     professors = json.load(f)
@@ -196,18 +305,102 @@ def alphabeticalNoDuplicates(directory):
     #                 instructor['avgRating'] = professors[instructor_name]['avgRating']
     #                 instructor['avgDifficulty'] = professors[instructor_name]['avgDifficulty']
 
-    # Write data to file
+    # Write data to file, in the same layout as json.dump(..., indent=4)
     with open(output_file_name, 'w') as file:
-        json.dump(unique_courses, file, indent=4)
+        if not unique_courses:
+            file.write('[]')
+            return output_file_name
+        file.write('[\n    ')
+        for i, (_, text) in enumerate(unique_courses):
+            if i:
+                file.write(',\n    ')
+            file.write(text)
+        file.write('\n]')
+
+    return output_file_name
+
+def course_fingerprints(courses):
+    """
+    Returns {code: SHA-1 of the course's canonical JSON}. Later duplicates of
+    a code win, matching how the server loads a term.
+    """
+    return {
+        course['code']: hashlib.sha1(json.dumps(course, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+        for course in courses
+    }
+
+def fingerprint_index_path(term, year):
+    return os.path.join(delta_dir, f'{year}_{term}_fingerprints.json')
+
+def changeset_files(term, year):
+    return sorted(glob.glob(os.path.join(delta_dir, f'{year}_{term}_changeset_*.json')))
+
+def update_delta_state(clean_file, term, year, delta):
+    """
+    Records the fingerprint of every course in clean_file for the next run.
+
+    With delta=True and an index from a previous run, writes only the added,
+    changed and removed courses to courses/delta/{year}_{term}_changeset_<time>.json
+    (nothing when the catalog is unchanged) and deletes clean_file, so the
+    full term file is not rewritten. Otherwise clean_file becomes the new
+    base: older changesets for the term are deleted, as they are already
+    reflected in it. Returns the changeset path, or None.
+
+    Fingerprints cover the scraped course only, before scrapeRMP.py merges
+    ratings in. A rating change on an otherwise unchanged course is therefore
+    not part of any changeset; it reaches the server with the next full
+    (non-delta) run, which the scraper workflow schedules daily.
+    """
+    with open(clean_file) as f:
+        courses = json.load(f)
+    fingerprints = course_fingerprints(courses)
+
+    index_path = fingerprint_index_path(term, year)
+    previous = None
+    if delta and os.path.exists(index_path):
+        with open(index_path) as f:
+            previous = json.load(f)
+
+    os.makedirs(delta_dir, exist_ok=True)
+    changeset_path = None
+    if previous is None:
+        for file in changeset_files(term, year):
+            os.remove(file)
+    else:
+        latest = {course['code']: course for course in courses}
+        changeset = {
+            'year': str(year),
+            'term': term,
+            'added': [latest[code] for code in sorted(fingerprints) if code not in previous],
+            'changed': [latest[code] for code in sorted(fingerprints)
+                        if code in previous and previous[code] != fingerprints[code]],
+            'removed': sorted(code for code in previous if code not in fingerprints),
+        }
+        print(f"Delta for {term} {year}: {len(changeset['added'])} added, "
+              f"{len(changeset['changed'])} changed, {len(changeset['removed'])} removed")
+        if changeset['added'] or changeset['changed'] or changeset['removed']:
+            changeset_path = os.path.join(
+                delta_dir, f'{year}_{term}_changeset_' + datetime.now().strftime('%Y%m%d%H%M%S') + '.json'
+            )
+            with open(changeset_path, 'w') as f:
+                json.dump(changeset, f, indent=4)
+        os.remove(clean_file)
+
+    with open(index_path, 'w') as f:
+        json.dump(fingerprints, f, indent=4, sort_keys=True)
+    return changeset_path
 
 
 if __name__ == '__main__':
+    # --delta emits a changeset against the previous run instead of a full term file
+    delta = '--delta' in sys.argv[1:]
+    terms = [arg for arg in sys.argv[1:] if arg != '--delta']
+
     # Check if correct number of arguments are given
-    if len(sys.argv) < 3:
-        print("Usage: script.py <term> <year> [<term> <year> ...]")
+    if len(terms) < 2:
+        print("Usage: script.py [--delta] <term> <year> [<term> <year> ...]")
         sys.exit(1)
 
-    terms = sys.argv[1:]
     for i in range(0, len(terms), 2):
         term = terms[i].lower()
         year = terms[i + 1]
@@ -224,8 +417,9 @@ if __name__ == '__main__':
             print("Year should be a two-digit number between 00 and 99")
             sys.exit(1)
 
-        # Delete existing JSON files for the current term and year
+        # Delete existing JSON files and leftover segments for the current term and year
         current_files = glob.glob(os.path.join(courses_dir, f'*_{year}_{term}.json'))
+        current_files += glob.glob(os.path.join(courses_dir, f'*_{year}_{term}*.ndjson'))
         for file in current_files:
             try:
                 os.remove(file)
@@ -237,36 +431,30 @@ if __name__ == '__main__':
         term_num = str(2) + str(year) + term_dict[term]
 
         url = f'https://one.ufl.edu/apix/soc/schedule/?category=RES&term={term_num}&last-control-number='
-        threads = []
-        for i in range(16):  # Create 16 threads
-            t = threading.Thread(target=thread_handler, args=(i, 50 * i, url, term, year))
-            t.start()
-            threads.append(t)
-
-        for t in threads:  # Wait for all threads to finish
-            t.join()
+        try:
+            scrape_term(url, term, year)
+        except ScrapeError as e:
+            logging.error(str(e))
+            sys.exit(1)
 
         print(f'Total API calls for {term} {year}: {counter.value}')
 
         # Merge all thread files into one final file
-        merge_json_files(term, year)
-
-        # Get a list of all JSON files in the 'courses' directory for the current term and year
-        json_files = glob.glob(os.path.join(courses_dir, f'*_{year}_{term}.json'))
-
-        # Iterate over each JSON file
-        for file in json_files:
-            if not file.endswith("_clean.json"):  # Check if the file does not already have "_clean.json" at the end
-                # Call alphabeticalNoDuplicates() from cleanData module with the file as a parameter
-                alphabeticalNoDuplicates(file)
-
-                # Delete the original file
-                try:
-                    os.remove(file)
-                    print(f"Deleted file: {file}\n\n\n\n\n")
-                except OSError as e:
-                    logging.error(f'Error while deleting file {file}. Error message: {e.strerror}')
-                    sys.exit(1)
+        merged_file = merge_json_files(term, year)
+
+        # Deduplicate and clean the merged file into *_clean.json
+        clean_file = alphabeticalNoDuplicates(merged_file)
+
+        # Record course fingerprints, and in delta mode swap the clean file for a changeset
+        update_delta_state(clean_file, term, year, delta)
+
+        # Delete the merged file
+        try:
+            os.remove(merged_file)
+            print(f"Deleted file: {merged_file}\n\n\n\n\n")
+        except OSError as e:
+            logging.error(f'Error while deleting file {merged_file}. Error message: {e.strerror}')
+            sys.exit(1)
         
         # Reset the counter value for the next iteration
         counter.value = 0
\ No newline at end of file
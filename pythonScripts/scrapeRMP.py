@@ -4,29 +4,62 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 import glob
 import os
+import random
+import time
 
 url = "https://www.ratemyprofessors.com/graphql"
 
-# Collect all .json files in "courses" that aren't _clean or _final
-course_files = [
-    f for f in glob.glob("courses/*.json")
-]
+# On-disk cache of lookups, committed with the data so scheduled runs only
+# query professors that are new or whose entry has expired.
+CACHE_FILE = "pythonScripts/RateMyProfessorCache.json"
+RMP_CACHE_TTL = float(os.environ.get('RMP_CACHE_TTL', 7 * 86400))
+# "Not found" answers are cached too, for less time: new ratings do appear.
+RMP_NEGATIVE_TTL = float(os.environ.get('RMP_NEGATIVE_TTL', 2 * 86400))
+RMP_CONCURRENCY = int(os.environ.get('RMP_CONCURRENCY', 8))
+RMP_RETRIES = int(os.environ.get('RMP_RETRIES', 4))
+RMP_BACKOFF = float(os.environ.get('RMP_BACKOFF', 1.0))
 
-professor = set()
+def collect_course_files():
+    """
+    Returns (course files, changesets that still need ratings merged in).
+    """
+    # Only freshly scraped _clean files; a _final file has already been merged,
+    # and a delta run leaves the existing _final files as the base
+    course_files = [
+        f for f in glob.glob("courses/*_clean.json")
+    ]
 
-# Build professor set from all relevant files
-for cf in course_files:
-    with open(cf, "r") as file:
-        data = json.load(file)
-        for course in data:
-            for section in course["sections"]:
-                for instructor in section["instructors"]:
-                    if instructor["name"]:
-                        professor.add(instructor["name"])
+    # Changesets from delta scrapes that have not had ratings merged in yet
+    changeset_files = []
+    for cf in sorted(glob.glob("courses/delta/*_changeset_*.json")):
+        with open(cf, "r") as file:
+            if not json.load(file).get("ratingsMerged"):
+                changeset_files.append(cf)
+    return course_files, changeset_files
 
-# Dictionary to store professor data
-professor_data = {}
-lock = threading.Lock()
+def collect_served_files():
+    """
+    Returns (_final files, every changeset): what the server currently
+    loads, whether or not this run merges anything into it.
+    """
+    return glob.glob("courses/*_final.json"), sorted(glob.glob("courses/delta/*_changeset_*.json"))
+
+def changeset_courses(changeset):
+    return changeset.get("added", []) + changeset.get("changed", [])
+
+def collect_professors(course_files, changeset_files):
+    professor = set()
+
+    # Build professor set from all relevant files
+    for cf in course_files + changeset_files:
+        with open(cf, "r") as file:
+            data = json.load(file)
+            for course in (changeset_courses(data) if cf in changeset_files else data):
+                for section in course["sections"]:
+                    for instructor in section["instructors"]:
+                        if instructor["name"]:
+                            professor.add(instructor["name"])
+    return professor
 
 
 headers = {
@@ -64,116 +97,260 @@ def merge_course_and_professor_data(course_file, professor_data_file):
     merged_file_name = course_file.replace('_clean', '_final')
     with open(merged_file_name, 'w') as f:
         json.dump(courses, f, indent=4)
-    
-    os.remove(course_file)
 
+    # The new file replaces any earlier scrape of the same term
+    term_suffix = os.path.basename(merged_file_name).split('_', 2)[2]
+    for old_file in glob.glob(os.path.join(os.path.dirname(merged_file_name), '*_' + term_suffix)):
+        if os.path.abspath(old_file) != os.path.abspath(merged_file_name):
+            os.remove(old_file)
+
+    if os.path.abspath(course_file) != os.path.abspath(merged_file_name):
+        os.remove(course_file)
+
+def merge_changeset_and_professor_data(changeset_file, professor_data_file):
+    with open(changeset_file, 'r') as f:
+        changeset = json.load(f)
+
+    with open(professor_data_file, 'r') as f:
+        professors = json.load(f)
+
+    for course in changeset_courses(changeset):
+        for section in course['sections']:
+            for instructor in section['instructors']:
+                instructor_name = instructor["name"]
+                if instructor_name in professors:
+                    instructor.update(professors[instructor_name])
+
+    # Rewritten in place and marked, so later runs leave it alone
+    changeset["ratingsMerged"] = True
+    with open(changeset_file, 'w') as f:
+        json.dump(changeset, f, indent=4)
+
+
+class RMPError(Exception):
+    pass
+
+def cache_entry(data, now):
+    """
+    A cache record for one lookup; data is None for "no rated match". The
+    TTL is spread by +/-25% so entries seeded together do not all expire on
+    the same run.
+    """
+    ttl = RMP_CACHE_TTL if data is not None else RMP_NEGATIVE_TTL
+    return {"data": data, "fetchedAt": int(now), "expiresAt": int(now + ttl * random.uniform(0.75, 1.25))}
+
+def is_fresh(entry, now):
+    return entry is not None and entry.get("expiresAt", 0) > now
+
+def load_cache(now=None):
+    """
+    Loads the professor cache. Without one, seeds it from an existing
+    RateMyProfessorData.json with expiry times spread over the TTL, so the
+    first cached run does not refetch everyone at once.
+    """
+    now = time.time() if now is None else now
+    if os.path.exists(CACHE_FILE):
+        with open(CACHE_FILE, "r") as f:
+            return json.load(f)
+    cache = {}
+    if os.path.exists("pythonScripts/RateMyProfessorData.json"):
+        with open("pythonScripts/RateMyProfessorData.json", "r") as f:
+            for name, data in json.load(f).items():
+                cache[name] = {"data": data, "fetchedAt": int(now),
+                               "expiresAt": int(now + RMP_CACHE_TTL * random.random())}
+    return cache
+
+def save_cache(cache):
+    with open(CACHE_FILE, "w") as f:
+        json.dump(cache, f, indent=4, sort_keys=True)
+
+QUERY = """
+query NewSearchTeachersQuery($query: TeacherSearchQuery!) {
+    newSearch {
+        teachers(query: $query) {
+            didFallback
+            edges {
+                cursor
+                node {
+                    id
+                    legacyId
+                    firstName
+                    lastName
+                    avgRatingRounded
+                    numRatings
+                    wouldTakeAgainPercentRounded
+                    wouldTakeAgainCount
+                    teacherRatingTags {
+                        id
+                        legacyId
+                        tagCount
+                        tagName
+                    }
+                    mostUsefulRating {
+                        id
+                        class
+                        isForOnlineClass
+                        legacyId
+                        comment
+                        helpfulRatingRounded
+                        ratingTags
+                        grade
+                        date
+                        iWouldTakeAgain
+                        qualityRating
+                        difficultyRatingRounded
+                        teacherNote{
+                            id
+                            comment
+                            createdAt
+                            class
+                        }
+                        thumbsDownTotal
+                        thumbsUpTotal
+                    }
+                    avgDifficultyRounded
+                    school {
+                        name
+                        id
+                    }
+                    department
+                }
+            }
+        }
+    }
+}
+"""
+
+thread_local = threading.local()
+
+def get_session():
+    """
+    One keep-alive session per worker thread.
+    """
+    session = getattr(thread_local, "session", None)
+    if session is None:
+        session = thread_local.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(headers)
+    return session
 
 def fetch_professor_data(prof):
-  print(f"Fetching data for professor {prof}...")
-  query = """
-  query NewSearchTeachersQuery($query: TeacherSearchQuery!) {
-      newSearch {
-          teachers(query: $query) {
-              didFallback
-              edges {
-                  cursor
-                  node {
-                      id
-                      legacyId
-                      firstName
-                      lastName
-                      avgRatingRounded
-                      numRatings
-                      wouldTakeAgainPercentRounded
-                      wouldTakeAgainCount
-                      teacherRatingTags {
-                          id
-                          legacyId
-                          tagCount
-                          tagName
-                      }
-                      mostUsefulRating {
-                          id
-                          class
-                          isForOnlineClass
-                          legacyId
-                          comment
-                          helpfulRatingRounded
-                          ratingTags
-                          grade
-                          date
-                          iWouldTakeAgain
-                          qualityRating
-                          difficultyRatingRounded
-                          teacherNote{
-                              id
-                              comment
-                              createdAt
-                              class
-                          }
-                          thumbsDownTotal
-                          thumbsUpTotal
-                      }
-                      avgDifficultyRounded
-                      school {
-                          name
-                          id
-                      }
-                      department
-                  }
-              }
-          }
-      }
-  }
-  """
-  variables = {"query": {"text": prof, "schoolID": "U2Nob29sLTExMDA="}}
-  payload = {
-      "query": query,
-      "variables": variables
-  }
-
-  response = requests.post(url, json=payload, headers=headers)
-  local_data = {}
-
-  if response.status_code == 200:
-      try:
-          response_data = response.json()
-
-          if response_data and "data" in response_data:
-              teacher_edges = response_data.get("data", {}).get(
-                  "newSearch", {}).get("teachers", {}).get("edges", [])
-              for edge in teacher_edges:
-                  node = edge["node"]
-                  if node["numRatings"] > 0 and (node["firstName"] + " " + node["lastName"]).lower() == prof.lower():
-                      local_data[prof] = {
-                          "avgRating": node.get("avgRatingRounded"),
-                          "avgDifficulty": node.get("avgDifficultyRounded"),
-                          "professorID": node.get("legacyId")
-                      }
-                      break  # Break once we found a valid teacher node
-      except json.JSONDecodeError:
-          print(f"Failed to decode JSON for professor {prof}.")
-      except Exception as e:
-          print(f"Error processing data for professor {prof}: {str(e)}")
-  else:
-      print(f"Failed to fetch data for professor {prof}, status code: {response.status_code}")
-      return None
-
-  # Using a lock to prevent simultaneous writes to the shared dictionary
-  with lock:
-      professor_data.update(local_data)
-
-with ThreadPoolExecutor(max_workers=16) as executor:
-    futures = [executor.submit(fetch_professor_data, prof) for prof in professor]
-    for future in as_completed(futures):
-        # Just to handle any exceptions that might have been raised inside our function
-        future.result()
-
-# Saving professor data to RateMyProfessorData.json
-with open("pythonScripts/RateMyProfessorData.json", "w") as outfile:
-    json.dump(professor_data, outfile, indent=4)
-    print("Professor data saved to RateMyProfessorData.json")
-
-# Now merge professor data into each file
-for cf in course_files:
-    merge_course_and_professor_data(cf, "pythonScripts/RateMyProfessorData.json")
\ No newline at end of file
+    """
+    Looks prof up on RateMyProfessors. Returns its rating data, or None when
+    there is no rated professor with exactly that name. Connection errors,
+    429/5xx responses and undecodable bodies are retried with exponential
+    backoff; raises RMPError when the lookup keeps failing or the response
+    is not the expected shape (e.g. GraphQL errors with no data).
+    """
+    print(f"Fetching data for professor {prof}...")
+    variables = {"query": {"text": prof, "schoolID": "U2Nob29sLTExMDA="}}
+    payload = {
+        "query": QUERY,
+        "variables": variables
+    }
+
+    for attempt in range(RMP_RETRIES + 1):
+        try:
+            response = get_session().post(url, json=payload, timeout=30)
+            if response.status_code == 200:
+                response_data = response.json()
+                try:
+                    if response_data.get("errors") and not response_data.get("data"):
+                        raise RMPError(f"GraphQL errors: {response_data['errors']}")
+                    teacher_edges = (response_data.get("data") or {}).get(
+                        "newSearch", {}).get("teachers", {}).get("edges", [])
+                    for edge in teacher_edges:
+                        node = edge["node"]
+                        if node["numRatings"] > 0 and (node["firstName"] + " " + node["lastName"]).lower() == prof.lower():
+                            return {
+                                "avgRating": node.get("avgRatingRounded"),
+                                "avgDifficulty": node.get("avgDifficultyRounded"),
+                                "professorID": node.get("legacyId")
+                            }
+                    return None
+                except (AttributeError, KeyError, TypeError) as e:
+                    raise RMPError(f"unexpected response shape: {e!r}")
+            if response.status_code != 429 and response.status_code < 500:
+                raise RMPError(f"status code: {response.status_code}")
+            error = f"status code: {response.status_code}"
+        except ValueError:  # includes json.JSONDecodeError
+            error = "failed to decode JSON"
+        except requests.RequestException as e:
+            error = str(e)
+
+        if attempt == RMP_RETRIES:
+            raise RMPError(f"{error} (gave up after {RMP_RETRIES + 1} attempts)")
+        time.sleep(RMP_BACKOFF * (2 ** attempt) * (0.5 + random.random()))
+
+def refresh_professors(professors, cache, now=None, taught=None):
+    """
+    Fetches every professor whose cache entry is missing or expired, with at
+    most RMP_CONCURRENCY requests in flight, and drops expired entries for
+    names no longer taught. `taught` is every instructor in the served data
+    (professors by default); pass it whenever professors is only the subset
+    being merged this run. A failed lookup keeps the previous entry.
+    Returns (fetched, failed).
+    """
+    now = time.time() if now is None else now
+    taught = professors if taught is None else taught
+    stale = sorted(prof for prof in professors if not is_fresh(cache.get(prof), now))
+    for name in list(cache):
+        if name not in taught and not is_fresh(cache[name], now):
+            del cache[name]
+
+    fetched = failed = 0
+    with ThreadPoolExecutor(max_workers=RMP_CONCURRENCY) as executor:
+        futures = {executor.submit(fetch_professor_data, prof): prof for prof in stale}
+        for future in as_completed(futures):
+            prof = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:  # RMPError, or anything unexpected: keep the old entry
+                print(f"Failed to fetch data for professor {prof}, {e}")
+                failed += 1
+                continue
+            cache[prof] = cache_entry(data, now)
+            fetched += 1
+    return fetched, failed
+
+def main():
+    course_files, changeset_files = collect_course_files()
+    professor = collect_professors(course_files, changeset_files)
+    # On a delta run the files above are only what changed; the rest of the
+    # served data still needs its cache entries and its place in the data file.
+    final_files, all_changesets = collect_served_files()
+    taught = professor | collect_professors(final_files, all_changesets)
+
+    cache = load_cache()
+    try:
+        fetched, failed = refresh_professors(professor, cache, taught=taught)
+    finally:
+        # Keep every lookup that did complete, even if the run is cut short
+        save_cache(cache)
+    print(f"{len(professor)} professors: {fetched} fetched, {failed} failed, "
+          f"{len(professor) - fetched - failed} served from cache")
+
+    # Dictionary to store professor data
+    professor_data = {
+        prof: cache[prof]["data"]
+        for prof in sorted(taught)
+        if prof in cache and cache[prof]["data"] is not None
+    }
+
+    # Saving professor data to RateMyProfessorData.json
+    with open("pythonScripts/RateMyProfessorData.json", "w") as outfile:
+        json.dump(professor_data, outfile, indent=4)
+        print("Professor data saved to RateMyProfessorData.json")
+
+    # Now merge professor data into each file
+    for cf in course_files:
+        merge_course_and_professor_data(cf, "pythonScripts/RateMyProfessorData.json")
+
+    for cf in changeset_files:
+        merge_changeset_and_professor_data(cf, "pythonScripts/RateMyProfessorData.json")
+
+
+if __name__ == '__main__':
+    main()
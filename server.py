@@ -1,12 +1,31 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, stream_with_context
 from flask_cors import CORS
 import json
 import glob
 import sqlite3
 import re
-import networkx as nx
+import base64
+import bisect
+import heapq
+import hashlib
+import hmac
 import gc
 import os
+import threading
+import time
+import zlib
+from PoolModule import ConnectionPool
+from CacheModule import ResultCache
+from StoreModule import CourseStore
+from GraphModule import CodeTable, PrereqGraph, ReachabilityIndex
+from TrieModule import TrieNode
+from FuzzyModule import FuzzyIndex
+from ScheduleModule import ScheduleBuilder
+
+try:
+    import brotli
+except ImportError:  # Optional: catalogs are then served with gzip only.
+    brotli = None
 
 app = Flask(__name__)
 CORS(app, origins=[
@@ -23,8 +42,16 @@ CORS(app, origins=[
 # -------------------------------------------------------------------
 
 json_files = glob.glob('courses/*_final.json')
-course_data_map = {}  # Dictionary keyed by (year, term) -> {code -> course}
+course_data_map = {}  # Dictionary keyed by (year, term) -> CourseStore {code -> course}, read from the term DB
 course_dept_map = {}  # Dictionary keyed by (year, term) -> {code -> deptName}
+loaded_sources = {}  # Dictionary keyed by (year, term) -> (json path, 'size:mtime', changeset paths) last loaded
+prereq_index_map = {}  # Dictionary keyed by (year, term) -> precomputed prerequisite edges and dept index
+autocomplete_map = {}  # Dictionary keyed by (year, term) -> (TrieNode, {code -> suggestion JSON bytes})
+fuzzy_index_map = {}  # Dictionary keyed by (year, term) -> FuzzyIndex
+catalog_map = {}  # Dictionary keyed by (year, term) -> precompressed full catalog (see write_catalog)
+
+# Bump when the per-term DB layout changes; older DBs are rebuilt on startup.
+SCHEMA_VERSION = '4'
 
 def parse_year_term_from_filename(filename):
     """
@@ -44,6 +71,16 @@ def parse_year_term_from_filename(filename):
         term = term.replace('final.json', '')
     return year, term
 
+def latest_term_files(paths):
+    """
+    Returns {(year, term): path}, keeping the most recently modified file
+    when several final JSON files exist for the same term.
+    """
+    latest = {}
+    for path in sorted(paths, key=os.path.getmtime):
+        latest[parse_year_term_from_filename(path)] = path
+    return latest
+
 # -------------------------------------------------------------------
 # 2. Create/Open SQLite Database(s) for each (year, term)
 #    and Create FTS Table with Prefixes, then insert data.
@@ -55,23 +92,507 @@ def get_connection(db_name):
     """
     return sqlite3.connect(db_name)
 
+def db_name_for(year, term):
+    """
+    Returns the SQLite database filename for a (year, term). Only term loading
+    writes to it; requests read the immutable snapshots published from it.
+    """
+    return f'courses_{year}_{term}.db'
+
+def snapshot_name_for(year, term, version):
+    """
+    Returns the filename of a published snapshot of a term DB.
+    """
+    return f'courses_{year}_{term}.{version}.db'
+
+def loaded_snapshot_for(year, term):
+    """
+    Returns the snapshot file this worker's loaded store for (year, term) reads.
+    """
+    return course_data_map[(year, term)].path
+
+# Read-only connections reused per worker thread by /api/get_courses.
+connection_pool = ConnectionPool(loaded_snapshot_for)
+
+# Matched course codes keyed by (year, term, searchTerm, itemsPerPage, startFrom, after, snapshot path).
+search_cache = ResultCache(
+    max_entries=int(os.environ.get('SEARCH_CACHE_SIZE', 4096)),
+    ttl=int(os.environ.get('SEARCH_CACHE_TTL', 300))
+)
+# Prerequisite graphs for /generate_a_list keyed by (year, term, selectedMajor).
+major_graph_cache = ResultCache(max_entries=1024, ttl=24 * 60 * 60)
+# Results precomputed at every trie node whose prefix is at most this many characters.
+AUTOCOMPLETE_TOP_K = 20
+AUTOCOMPLETE_HOT_DEPTH = 4
+# Time budget for scoring one fuzzy search, in milliseconds.
+FUZZY_BUDGET_MS = int(os.environ.get('FUZZY_BUDGET_MS', 50))
+# Caps for /api/generate_schedules.
+MAX_SCHEDULES = 5000
+MAX_SCHEDULE_COURSES = 10
+# Most codes /api/courses/batch accepts in one request.
+MAX_BATCH_CODES = 100
+# Number of most common department prefixes to pre-run at startup (0 disables).
+CACHE_WARM_PREFIXES = int(os.environ.get('CACHE_WARM_PREFIXES', 0))
+# Seconds a superseded snapshot is kept for workers that have not reloaded yet
+# (0 keeps them all). Should exceed the longest a worker goes between reloads.
+SNAPSHOT_GRACE = int(os.environ.get('SNAPSHOT_GRACE', 3600))
+# Seconds after which an unfinished snapshot copy is taken to be from a crashed publish.
+SNAPSHOT_TMP_MAX_AGE = 600
+
+def serialize_course(course):
+    """
+    Encodes a course the same way jsonify would, so stored bytes can be spliced
+    straight into responses.
+    """
+    return json.dumps(
+        course,
+        ensure_ascii=app.json.ensure_ascii,
+        sort_keys=app.json.sort_keys,
+        separators=(',', ':')
+    ).encode('utf-8')
+
+def json_array_response(blobs):
+    """
+    Builds a JSON array response by joining pre-serialized JSON blobs.
+    None entries (codes that are not stored) are left out.
+    """
+    return app.response_class(b'[' + b','.join(blob for blob in blobs if blob is not None) + b']',
+                              mimetype='application/json')
+
+def ndjson_response(blobs):
+    """
+    Streams pre-serialized JSON blobs as NDJSON, one per line, so the first
+    results are sent before the rest are read.
+    """
+    def stream():
+        for blob in blobs:
+            yield blob + b'\n'
+    return app.response_class(stream_with_context(stream()), mimetype='application/x-ndjson')
+
+def build_catalog(conn):
+    """
+    Builds a term's full catalog: every stored course blob in code
+    order as one JSON array, compressed as it is read with gzip (and brotli
+    when installed). Returns {'etag', 'size', 'gzip', 'br'}; the ETag is a
+    hash of the uncompressed JSON, so it only changes with the catalog.
+    """
+    digest = hashlib.sha256()
+    gzip_stream = zlib.compressobj(9, zlib.DEFLATED, 31)
+    brotli_stream = brotli.Compressor(quality=9) if brotli is not None else None
+    gzip_parts = []
+    brotli_parts = []
+    size = 0
+
+    def feed(chunk):
+        nonlocal size
+        size += len(chunk)
+        digest.update(chunk)
+        gzip_parts.append(gzip_stream.compress(chunk))
+        if brotli_stream is not None:
+            brotli_parts.append(brotli_stream.process(chunk))
+
+    feed(b'[')
+    for i, (body,) in enumerate(conn.execute('SELECT body FROM course_blobs ORDER BY code;')):
+        feed(b',' + body if i else body)
+    feed(b']')
+    gzip_parts.append(gzip_stream.flush())
+    if brotli_stream is not None:
+        brotli_parts.append(brotli_stream.finish())
+
+    return {
+        'etag': digest.hexdigest()[:32],
+        'size': size,
+        'gzip': b''.join(gzip_parts),
+        'br': b''.join(brotli_parts) if brotli_stream is not None else None,
+    }
+
+def write_catalog(cur):
+    """
+    Builds the term's catalog from the rows visible to cur and stores it in
+    `catalog`, tagged with the DB version it was built from. Runs inside the
+    writer's transaction, so compression happens once per change of the
+    term instead of in every worker that loads it.
+    """
+    entry = build_catalog(cur)
+    cur.execute('DELETE FROM catalog;')
+    cur.execute('INSERT INTO catalog (version, etag, size, gzip, br) VALUES (?, ?, ?, ?, ?);',
+                (snapshot_version(cur), entry['etag'], entry['size'], entry['gzip'], entry['br']))
+
+def load_catalog(conn):
+    """
+    Returns the catalog stored in the term DB on conn. Builds it in memory
+    instead if the stored one is missing or was built for other data (a
+    writer died between committing courses and the catalog).
+    """
+    row = conn.execute('SELECT version, etag, size, gzip, br FROM catalog;').fetchone()
+    if row is None or row[0] != snapshot_version(conn):
+        return build_catalog(conn)
+    return {'etag': row[1], 'size': row[2], 'gzip': row[3], 'br': row[4]}
+
+def course_fts_row(course):
+    """
+    Returns the courses_fts column values for a course.
+    """
+    instructor_names = []
+    for section in course.get('sections', []):
+        for inst in section.get('instructors', []):
+            instructor_names.append(inst.get('name', ''))
+
+    return (
+        course['code'],
+        course.get('codeWithSpace', ''),
+        course.get('name', ''),
+        course.get('description', ''),
+        course.get('prerequisites', ''),
+        ' '.join(instructor_names)
+    )
+
+# Bit per meeting day, as used by UF's meetDays ('R' is Thursday).
+DAY_BITS = {'M': 1, 'T': 2, 'W': 4, 'R': 8, 'F': 16, 'S': 32, 'U': 64}
+
+def time_to_minutes(time_str):
+    """
+    Converts 'HH:MM' (24-hour, as written by the scraper) to minutes after
+    midnight. Returns None if it cannot be parsed.
+    """
+    try:
+        hours, minutes = time_str.split(':')
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+
+def course_section_rows(course):
+    """
+    Returns one (section_index, classNumber, credits, days_mask, earliest_begin,
+    latest_end, max_rating, min_difficulty, [(instructor, avgRating, avgDifficulty)])
+    tuple per section of a course, for the sections/section_instructors tables.
+    """
+    rows = []
+    for section_index, section in enumerate(course.get('sections', [])):
+        days_mask = 0
+        begins = []
+        ends = []
+        for meet_time in section.get('meetTimes', []):
+            for day in meet_time.get('meetDays', []):
+                days_mask |= DAY_BITS.get(day, 0)
+            begin = time_to_minutes(meet_time.get('meetTimeBegin'))
+            end = time_to_minutes(meet_time.get('meetTimeEnd'))
+            if begin is not None:
+                begins.append(begin)
+            if end is not None:
+                ends.append(end)
+
+        credits = section.get('credits')
+        if not isinstance(credits, (int, float)):
+            credits = section.get('credits_min')
+            credits = credits if isinstance(credits, (int, float)) else None
+
+        instructors = [
+            (inst.get('name', ''), inst.get('avgRating'), inst.get('avgDifficulty'))
+            for inst in section.get('instructors', [])
+        ]
+        ratings = [rating for _, rating, _ in instructors if rating is not None]
+        difficulties = [difficulty for _, _, difficulty in instructors if difficulty is not None]
+
+        rows.append((
+            section_index,
+            section.get('classNumber'),
+            credits,
+            days_mask,
+            min(begins) if begins else None,
+            max(ends) if ends else None,
+            max(ratings) if ratings else None,
+            min(difficulties) if difficulties else None,
+            instructors
+        ))
+    return rows
+
+def write_course_rows(cur, stale, fresh, courses_by_code, json_by_code, new_hashes):
+    """
+    Deletes every row of the codes in `stale` (code -> courses_fts rowid) and
+    inserts the codes in `fresh` into courses_fts, course_hashes, course_blobs
+    and the section tables. Runs inside the caller's transaction.
+    """
+    cur.executemany('DELETE FROM courses_fts WHERE rowid = ?;', [(rowid,) for rowid in stale.values()])
+    cur.executemany('DELETE FROM course_hashes WHERE code = ?;', [(code,) for code in stale])
+    cur.executemany('DELETE FROM course_blobs WHERE code = ?;', [(code,) for code in stale])
+    cur.executemany('''
+        DELETE FROM section_instructors
+        WHERE section_id IN (SELECT section_id FROM sections WHERE code = ?)
+    ''', [(code,) for code in stale])
+    cur.executemany('DELETE FROM sections WHERE code = ?;', [(code,) for code in stale])
+
+    next_rowid = (cur.execute('SELECT max(rowid) FROM courses_fts;').fetchone()[0] or 0) + 1
+    fresh_rowids = {code: next_rowid + i for i, code in enumerate(fresh)}
+    cur.executemany('''
+        INSERT INTO courses_fts (rowid, code, codeWithSpace, name, description, prerequisites, instructors)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(fresh_rowids[code],) + course_fts_row(courses_by_code[code]) for code in fresh])
+    cur.executemany(
+        'INSERT INTO course_hashes (code, hash, fts_rowid) VALUES (?, ?, ?);',
+        [(code, new_hashes[code], fresh_rowids[code]) for code in fresh]
+    )
+    cur.executemany(
+        'INSERT INTO course_blobs (code, dept_name, body) VALUES (?, ?, ?);',
+        [(code, course_dept_name(courses_by_code[code]), json_by_code[code]) for code in fresh]
+    )
+
+    section_rows = []
+    instructor_rows = []
+    section_id = (cur.execute('SELECT max(section_id) FROM sections;').fetchone()[0] or 0) + 1
+    for code in fresh:
+        for row in course_section_rows(courses_by_code[code]):
+            section_rows.append((section_id, code) + row[:-1])
+            instructor_rows.extend((section_id,) + inst for inst in row[-1])
+            section_id += 1
+    cur.executemany('''
+        INSERT INTO sections (section_id, code, section_index, class_number, credits, days_mask,
+                              earliest_begin, latest_end, max_rating, min_difficulty)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', section_rows)
+    cur.executemany('''
+        INSERT INTO section_instructors (section_id, name, avg_rating, avg_difficulty)
+        VALUES (?, ?, ?, ?)
+    ''', instructor_rows)
+
+def parse_term_json(raw):
+    """
+    Returns ({code: course}, {code: serialized course}) for the bytes of a
+    final JSON file. Later duplicates of a code win.
+    """
+    courses_by_code = {course['code']: course for course in json.loads(raw)}
+    json_by_code = {code: serialize_course(course) for code, course in courses_by_code.items()}
+    return courses_by_code, json_by_code
+
+def sync_term_db(conn, source_hash, source_stat, raw):
+    """
+    Brings courses_fts, course_blobs, course_hashes and the sections /
+    section_instructors filter tables in line with the courses in raw, the
+    bytes of the source JSON.
+
+    The hash of the source JSON is kept in `manifest`; if it matches nothing is
+    touched. Otherwise raw is parsed, each course's serialized bytes are hashed
+    and compared with `course_hashes`, and only added, changed and removed
+    courses are written, in a single transaction. Both checks happen under
+    the write lock, so another worker syncing first can never make this one
+    diff against an unparsed, empty course set. A schema version mismatch
+    rebuilds everything. Returns (inserted, deleted) row counts.
+    """
+    conn.isolation_level = None
+    cur = conn.cursor()
+    cur.execute('BEGIN IMMEDIATE;')
+    try:
+        # Re-checked under the write lock so concurrently booting workers only sync once.
+        manifest = dict(cur.execute('SELECT name, value FROM manifest;'))
+        if manifest.get('schema') == SCHEMA_VERSION and manifest.get('source_hash') == source_hash:
+            cur.execute("INSERT OR REPLACE INTO manifest (name, value) VALUES ('source_stat', ?);", (source_stat,))
+            cur.execute('COMMIT;')
+            return 0, 0
+
+        courses_by_code, json_by_code = parse_term_json(raw)
+
+        if manifest.get('schema') != SCHEMA_VERSION:
+            # Built by an older server: rows may be untracked or missing columns.
+            cur.execute('DELETE FROM courses_fts;')
+            cur.execute('DELETE FROM course_blobs;')
+            cur.execute('DELETE FROM course_hashes;')
+            cur.execute('DELETE FROM section_instructors;')
+            cur.execute('DELETE FROM sections;')
+            cur.execute('DELETE FROM catalog;')
+
+        old_hashes = {
+            code: (course_hash, fts_rowid)
+            for code, course_hash, fts_rowid in cur.execute('SELECT code, hash, fts_rowid FROM course_hashes;')
+        }
+        new_hashes = {code: hashlib.sha1(blob).hexdigest() for code, blob in json_by_code.items()}
+
+        stale = [code for code, (course_hash, _) in old_hashes.items() if new_hashes.get(code) != course_hash]
+        fresh = [code for code, course_hash in new_hashes.items()
+                 if code not in old_hashes or old_hashes[code][0] != course_hash]
+
+        write_course_rows(
+            cur, {code: old_hashes[code][1] for code in stale}, fresh, courses_by_code, json_by_code, new_hashes
+        )
+        # Changesets were applied on top of the old source; pending ones are replayed after this.
+        cur.execute('DELETE FROM applied_changesets;')
+
+        cur.executemany("INSERT OR REPLACE INTO manifest (name, value) VALUES (?, ?);", [
+            ('schema', SCHEMA_VERSION),
+            ('source_hash', source_hash),
+            ('source_stat', source_stat),
+        ])
+        write_catalog(cur)
+        cur.execute('COMMIT;')
+    except Exception:
+        cur.execute('ROLLBACK;')
+        raise
+    return len(fresh), len(stale)
+
+def term_changeset_files(year, term):
+    """
+    Returns the delta-scrape changesets for a term, oldest first; their
+    names end in a sortable timestamp.
+    """
+    return sorted(glob.glob(os.path.join('courses', 'delta', f'{year}_{term}_changeset_*.json')))
+
+def apply_changesets(conn, paths):
+    """
+    Applies each changeset in paths that the DB has not applied yet, in order
+    and each in its own transaction: "added" and "changed" courses replace
+    their rows, "removed" codes are deleted. Applied names are recorded in
+    `applied_changesets`. The catalog is then rebuilt once, unless another
+    worker already did. Returns the number applied.
+    """
+    conn.isolation_level = None
+    cur = conn.cursor()
+    applied = 0
+    for path in paths:
+        name = os.path.basename(path)
+        cur.execute('BEGIN IMMEDIATE;')
+        try:
+            if cur.execute('SELECT 1 FROM applied_changesets WHERE name = ?;', (name,)).fetchone():
+                cur.execute('COMMIT;')
+                continue
+            with open(path, 'rb') as f:
+                changeset = json.load(f)
+
+            courses_by_code = {course['code']: course for course in changeset.get('added', []) + changeset.get('changed', [])}
+            json_by_code = {code: serialize_course(course) for code, course in courses_by_code.items()}
+            new_hashes = {code: hashlib.sha1(blob).hexdigest() for code, blob in json_by_code.items()}
+            old_hashes = {
+                code: (course_hash, fts_rowid)
+                for code, course_hash, fts_rowid in cur.execute('SELECT code, hash, fts_rowid FROM course_hashes;')
+            }
+
+            fresh = [code for code, course_hash in new_hashes.items()
+                     if code not in old_hashes or old_hashes[code][0] != course_hash]
+            stale = {code: old_hashes[code][1] for code in fresh + changeset.get('removed', []) if code in old_hashes}
+            write_course_rows(cur, stale, fresh, courses_by_code, json_by_code, new_hashes)
+            cur.execute('INSERT INTO applied_changesets (name) VALUES (?);', (name,))
+            cur.execute('COMMIT;')
+        except Exception:
+            cur.execute('ROLLBACK;')
+            raise
+        applied += 1
+
+    if applied:
+        cur.execute('BEGIN IMMEDIATE;')
+        try:
+            stored = cur.execute('SELECT version FROM catalog;').fetchone()
+            if stored is None or stored[0] != snapshot_version(cur):
+                write_catalog(cur)
+            cur.execute('COMMIT;')
+        except Exception:
+            cur.execute('ROLLBACK;')
+            raise
+    return applied
+
+def snapshot_version(conn):
+    """
+    Returns a short hash of what a term DB holds: the schema, the source
+    JSON and the changesets applied on top. Equal versions hold the same
+    courses, so workers that sync the same data share one snapshot file.
+    """
+    manifest = dict(conn.execute('SELECT name, value FROM manifest;'))
+    applied = [name for (name,) in conn.execute('SELECT name FROM applied_changesets ORDER BY name;')]
+    state = json.dumps([manifest.get('schema'), manifest.get('source_hash'), applied])
+    return hashlib.sha256(state.encode('utf-8')).hexdigest()[:16]
+
+def publish_snapshot(conn, year, term):
+    """
+    Returns the path of an immutable copy of the term DB on conn, creating
+    it if this version has not been published yet. The copy is made with
+    the backup API into a temporary file, versioned from its own manifest
+    (so it is right even if another worker wrote in between) and renamed
+    into place, then superseded snapshots are pruned.
+    """
+    path = snapshot_name_for(year, term, snapshot_version(conn))
+    if not os.path.exists(path):
+        tmp_path = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+        copy = sqlite3.connect(tmp_path)
+        try:
+            conn.backup(copy)
+            copy.execute('PRAGMA journal_mode=DELETE;')
+            path = snapshot_name_for(year, term, snapshot_version(copy))
+            copy.close()
+            os.replace(tmp_path, path)
+        except Exception:
+            copy.close()
+            remove_quietly(tmp_path)
+            raise
+    prune_snapshots(year, term, path)
+    return path
+
+def remove_quietly(path):
+    """
+    Deletes path, ignoring a file that is already gone (another worker
+    removed it first).
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def mtimes_of(paths):
+    """
+    Returns [(mtime, path)] sorted oldest first, skipping paths that have
+    disappeared since they were listed.
+    """
+    found = []
+    for path in paths:
+        try:
+            found.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    return sorted(found)
+
+def prune_snapshots(year, term, keep):
+    """
+    Deletes the term's snapshots that were superseded more than
+    SNAPSHOT_GRACE seconds ago, never the newest one or `keep`. Workers
+    still reading a deleted snapshot keep their open connections. Also
+    deletes temporary copies (and their journals) left behind by publishes
+    that crashed, once they are older than any publish could take.
+    """
+    now = time.time()
+    for mtime, tmp_path in mtimes_of(glob.glob(snapshot_name_for(year, term, '*') + '.*.tmp*')):
+        if mtime < now - SNAPSHOT_TMP_MAX_AGE:
+            remove_quietly(tmp_path)
+
+    if SNAPSHOT_GRACE <= 0:
+        return
+    snapshots = mtimes_of(glob.glob(snapshot_name_for(year, term, '*')))
+    cutoff = now - SNAPSHOT_GRACE
+    for (_, snapshot), (successor_mtime, _) in zip(snapshots, snapshots[1:]):
+        if snapshot != keep and successor_mtime < cutoff:
+            remove_quietly(snapshot)
+
+def course_dept_name(course):
+    """
+    Returns the department name of a course's first section, or ''.
+    """
+    sections = course.get('sections', [])
+    return sections[0].get("deptName", "") if sections else ""
+
 def init_db_for_file(json_path):
     """
     - Parses (year, term) from json_path
     - Creates a DB named 'courses_{year}_{term}.db'
-    - Initializes the FTS table (with prefix) if needed
-    - Inserts all courses specific to that file
-    - Populates course_data_map[(year, term)] and course_dept_map[(year, term)]
+    - Initializes the FTS table (with prefix) and course_blobs store if needed
+    - Applies only the courses that changed since the DB was last synced;
+      the JSON is not parsed at all when the file is unchanged
+    - Applies pending delta-scrape changesets from courses/delta on top
+    - Publishes the result as an immutable, versioned snapshot file
+    - Populates course_data_map[(year, term)] with a CourseStore bound to the
+      snapshot, and every other per-term index from that same snapshot
     """
     year, term = parse_year_term_from_filename(json_path)
-    db_name = f'courses_{year}_{term}.db'
-    
-    with open(json_path) as f:
-        all_courses = json.load(f)
+    db_name = db_name_for(year, term)
 
     conn = get_connection(db_name)
     cur = conn.cursor()
     cur.execute("PRAGMA journal_mode=WAL;")
+    cur.execute("PRAGMA busy_timeout=30000;")
 
     cur.execute('''
         CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts
@@ -85,51 +606,169 @@ def init_db_for_file(json_path):
             prefix='2 3 4'
         )
     ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS manifest (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS course_hashes (
+            code TEXT PRIMARY KEY,
+            hash TEXT NOT NULL,
+            fts_rowid INTEGER NOT NULL
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS applied_changesets (
+            name TEXT PRIMARY KEY
+        )
+    ''')
+    # The full catalog, compressed once by whichever worker wrote the courses.
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS catalog (
+            version TEXT NOT NULL,
+            etag TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            gzip BLOB NOT NULL,
+            br BLOB
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS course_blobs (
+            code TEXT PRIMARY KEY,
+            dept_name TEXT NOT NULL,
+            body BLOB NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    # Normalized section data with per-section aggregates for /api/filter_courses.
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS sections (
+            section_id INTEGER PRIMARY KEY,
+            code TEXT NOT NULL,
+            section_index INTEGER NOT NULL,
+            class_number INTEGER,
+            credits REAL,
+            days_mask INTEGER NOT NULL,
+            earliest_begin INTEGER,
+            latest_end INTEGER,
+            max_rating REAL,
+            min_difficulty REAL
+        )
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS section_instructors (
+            section_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            avg_rating REAL,
+            avg_difficulty REAL
+        )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS sections_code ON sections (code);')
+    cur.execute('CREATE INDEX IF NOT EXISTS sections_earliest_begin ON sections (earliest_begin);')
+    cur.execute('CREATE INDEX IF NOT EXISTS sections_latest_end ON sections (latest_end);')
+    cur.execute('CREATE INDEX IF NOT EXISTS sections_max_rating ON sections (max_rating);')
+    cur.execute('CREATE INDEX IF NOT EXISTS sections_credits ON sections (credits);')
+    cur.execute('CREATE INDEX IF NOT EXISTS section_instructors_section ON section_instructors (section_id);')
+    cur.execute('CREATE INDEX IF NOT EXISTS section_instructors_name ON section_instructors (name COLLATE NOCASE);')
+    conn.commit()
 
-    row_count = cur.execute('SELECT count(*) FROM courses_fts;').fetchone()[0]
-    if row_count == 0:
-        for course in all_courses:
-            code = course['code']
-            codeWithSpace = course.get('codeWithSpace', '')
-            name = course.get('name', '')
-            description = course.get('description', '')
-            prerequisites = course.get('prerequisites', '')
-
-            instructor_names = []
-            for section in course.get('sections', []):
-                for inst in section.get('instructors', []):
-                    instructor_names.append(inst.get('name', ''))
-            instructors_joined = ' '.join(instructor_names)
-
-            cur.execute('''
-                INSERT INTO courses_fts (code, codeWithSpace, name, description, prerequisites, instructors)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (code, codeWithSpace, name, description, prerequisites, instructors_joined))
-
+    changesets = term_changeset_files(year, term)
+    on_disk = {os.path.basename(path) for path in changesets}
+    if any(name not in on_disk for (name,) in cur.execute('SELECT name FROM applied_changesets;')):
+        # An applied changeset is gone (folded into a new full scrape): resync from the JSON.
+        cur.execute("DELETE FROM manifest WHERE name IN ('source_hash', 'source_stat');")
         conn.commit()
 
-    conn.close()
+    # Cheap check first: an untouched file has the same size and mtime.
+    st = os.stat(json_path)
+    source_stat = f'{st.st_size}:{st.st_mtime_ns}'
+    manifest = dict(cur.execute('SELECT name, value FROM manifest;'))
+    if manifest.get('schema') != SCHEMA_VERSION or manifest.get('source_stat') != source_stat:
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+        source_hash = hashlib.sha256(raw).hexdigest()
 
-    # Build the code->course map and code->deptName map
-    local_course_map = {}
-    local_dept_map = {}
-    for course in all_courses:
-        local_course_map[course['code']] = course
-        sections = course.get('sections', [])
-        dept_name = sections[0].get("deptName", "") if sections else ""
-        local_dept_map[course['code']] = dept_name
+        # Parsed only if the DB turns out to hold a different source.
+        inserted, deleted = sync_term_db(conn, source_hash, source_stat, raw)
+        del raw
+        if inserted or deleted:
+            print(f"{db_name}: indexed {inserted} changed courses, removed {deleted} stale rows")
 
-    course_data_map[(year, term)] = local_course_map
-    course_dept_map[(year, term)] = local_dept_map
+    # Delta scrapes since the final JSON was written.
+    applied = apply_changesets(conn, changesets)
+    if applied:
+        print(f"{db_name}: applied {applied} changesets")
 
-# Initialize a DB for each final JSON on startup
-for jpath in json_files:
-    init_db_for_file(jpath)
+    # Everything below reads the snapshot, never the DB other workers write to.
+    snapshot = publish_snapshot(conn, year, term)
+    conn.close()
+    conn = sqlite3.connect(f'file:{snapshot}?mode=ro&immutable=1', uri=True)
+    local_dept_map = dict(conn.execute('SELECT code, dept_name FROM course_blobs ORDER BY code;'))
+    local_store = CourseStore(year, term, connection_pool, local_dept_map, snapshot)
+    local_prereq_index = build_prereq_index(conn, local_dept_map)
+    local_autocomplete = build_autocomplete_index(conn)
+    local_fuzzy_index = FuzzyIndex(conn.execute('SELECT code, codeWithSpace, name, instructors FROM courses_fts;'))
+    local_catalog = load_catalog(conn)
+    conn.close()
+
+    # Swapping the entries is atomic; requests that already hold the old
+    # store keep reading the old snapshot through it.
+    course_data_map[(year, term)] = local_store
+    course_dept_map[(year, term)] = local_dept_map
+    prereq_index_map[(year, term)] = local_prereq_index
+    autocomplete_map[(year, term)] = local_autocomplete
+    fuzzy_index_map[(year, term)] = local_fuzzy_index
+    catalog_map[(year, term)] = local_catalog
+    connection_pool.invalidate(year, term)
+    search_cache.invalidate(year, term)
+    major_graph_cache.invalidate(year, term)
+    loaded_sources[(year, term)] = (json_path, source_stat, tuple(changesets))
 
 # -------------------------------------------------------------------
 # 3. Modify the /api/get_courses route to accept year and term,
 #    then query the correct DB.
 # -------------------------------------------------------------------
+# Kept as a single constant so each pooled connection reuses its prepared statement.
+SEARCH_QUERY = '''
+    SELECT
+        code,
+        bm25(courses_fts) AS rank,
+        CASE 
+            WHEN codeWithSpace = :exactSearch THEN 0 
+            ELSE 1 
+        END AS top_sort
+    FROM courses_fts
+    WHERE courses_fts MATCH :ftsQuery
+    ORDER BY top_sort, rank
+    LIMIT :limit
+    OFFSET :offset
+'''
+
+# Keyset variant used with cursors: resumes strictly after (top_sort, rank, rowid)
+# so a deep page keeps only `limit` rows in the sorter instead of offset + limit.
+SEARCH_AFTER_QUERY = '''
+    SELECT code, rank, top_sort, row_id
+    FROM (
+        SELECT
+            code,
+            rowid AS row_id,
+            bm25(courses_fts) AS rank,
+            CASE 
+                WHEN codeWithSpace = :exactSearch THEN 0 
+                ELSE 1 
+            END AS top_sort
+        FROM courses_fts
+        WHERE courses_fts MATCH :ftsQuery
+    )
+    WHERE (top_sort, rank, row_id) > (:afterTopSort, :afterRank, :afterRowId)
+    ORDER BY top_sort, rank, row_id
+    LIMIT :limit
+'''
+
+# Position before every row: top_sort is always 0 or 1.
+FIRST_PAGE = (-1, 0.0, 0)
+
 @app.route("/api/get_courses", methods=['POST'])
 def get_courses():
     """
@@ -137,9 +776,19 @@ def get_courses():
       - searchTerm: the query string
       - itemsPerPage: number of items per page
       - startFrom: offset for pagination
+      - cursor: (optional) keyset pagination instead of startFrom; send null
+        for the first page, then the previous response's nextCursor
+      - fuzzy: (optional) true for typo-tolerant ranked matching, paged
+        with startFrom only
+      - stream: (optional) true to receive NDJSON, one course per line,
+        instead of a JSON list; not available with cursor
       - year:  '25'
       - term:  'fall', 'summer', 'spring', etc.
     Returns a JSON list of matched courses, from the correct DB.
+    In cursor mode returns {"courses": [...], "nextCursor": str or null}.
+    Code-shaped searches ('COP3502', 'cop 3502c', 'MAC2') that match some
+    course code are answered from the term's code index, in code order;
+    the X-Search-Path header reports 'code', 'fts' or 'fuzzy'.
     """
     data = request.json
     searchTerm = data.get('searchTerm', '').strip()
@@ -147,69 +796,699 @@ def get_courses():
     startFrom = data.get('startFrom', 0)
     year = data.get('year')
     term = data.get('term')
+    cursor_mode = 'cursor' in data
+    fuzzy = bool(data.get('fuzzy'))
+    stream = bool(data.get('stream'))
 
     # Validate year/term
     if not year or not term:
         return jsonify({"error": "Missing 'year' or 'term' in request body"}), 400
 
-    db_name = f'courses_{year}_{term}.db'
-    # Look up the relevant code->course dictionary
-    codes_dict = course_data_map.get((year, term), {})
+    if cursor_mode and (fuzzy or stream):
+        return jsonify({"error": "'cursor' is not supported with 'fuzzy' or 'stream'"}), 400
 
-    if not searchTerm:
-        return jsonify([])
+    if fuzzy or stream:
+        store = course_data_map.get((year, term))
+        codes = []
+        path = 'fuzzy' if fuzzy else 'fts'
+        if searchTerm and store is not None:
+            if fuzzy:
+                codes = fuzzy_course_codes(store, searchTerm, itemsPerPage, startFrom)
+            else:
+                codes, _, path = search_course_codes(store, searchTerm, itemsPerPage, startFrom)
+            record_search_path(path)
+        if stream:
+            response = ndjson_response(store.iter_blobs(codes) if codes else [])
+        else:
+            response = json_array_response(store.get_blobs(codes) if codes else [])
+        response.headers['X-Search-Path'] = path
+        return response
 
-    terms = searchTerm.split()
-    prefix_terms = [term + '*' for term in terms]
-    fts_query = ' '.join(prefix_terms)
+    after = None
+    if cursor_mode:
+        after = decode_cursor(data['cursor']) if data['cursor'] else FIRST_PAGE
+        if after is None:
+            return jsonify({"error": "Invalid 'cursor' in request body"}), 400
 
-    conn = get_connection(db_name)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    # Look up the relevant code->course store
+    store = course_data_map.get((year, term))
 
-    query = '''
-        SELECT
-            code,
-            codeWithSpace,
-            name,
-            description,
-            prerequisites,
-            instructors,
-            bm25(courses_fts) AS rank,
-            CASE 
-                WHEN codeWithSpace = :exactSearch THEN 0 
-                ELSE 1 
-            END AS top_sort
-        FROM courses_fts
-        WHERE courses_fts MATCH :ftsQuery
-        ORDER BY top_sort, rank
-        LIMIT :limit
-        OFFSET :offset
-    '''
+    if not searchTerm or store is None:
+        return jsonify({"courses": [], "nextCursor": None}) if cursor_mode else jsonify([])
+
+    codes, next_after, path = search_course_codes(store, searchTerm, itemsPerPage, startFrom, after)
+    record_search_path(path)
+    blobs = [blob for blob in store.get_blobs(codes) if blob is not None]
+    if not cursor_mode:
+        response = json_array_response(blobs)
+    else:
+        next_cursor = encode_cursor(next_after) if next_after else None
+        body = b'{"courses":[' + b','.join(blobs) + b'],"nextCursor":' + json.dumps(next_cursor).encode('utf-8') + b'}'
+        response = app.response_class(body, mimetype='application/json')
+    response.headers['X-Search-Path'] = path
+    return response
+
+def encode_cursor(position):
+    """
+    Packs a (top_sort, rank, rowid) FTS position, or a ('code', last code)
+    code-index position, into an opaque URL-safe string.
+    """
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """
+    Unpacks a cursor made by encode_cursor. Returns None if it is malformed.
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(position, list):
+            return None
+        if len(position) == 2 and position[0] == 'code' and isinstance(position[1], str):
+            return ('code', position[1])
+        top_sort, rank, rowid = position
+        return (int(top_sort), float(rank), int(rowid))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def normalize_search_term(searchTerm):
+    """
+    Collapses runs of whitespace so equivalent queries share a cache entry.
+    """
+    return ' '.join(searchTerm.split())
 
-    rows = cur.execute(query, {
+def run_search(conn, searchTerm, itemsPerPage, startFrom):
+    """
+    Runs the FTS query on conn and returns the matched course codes in rank order.
+    """
+    prefix_terms = [term + '*' for term in searchTerm.split()]
+    fts_query = ' '.join(prefix_terms)
+
+    rows = conn.execute(SEARCH_QUERY, {
         'exactSearch': searchTerm,
         'ftsQuery': fts_query,
         'limit': itemsPerPage,
         'offset': startFrom
     }).fetchall()
+    return [row[0] for row in rows]
 
-    results = []
-    for row in rows:
-        code = row['code']
-        course_obj = codes_dict.get(code, {})
-        results.append(course_obj)
+def run_search_after(conn, searchTerm, itemsPerPage, after):
+    """
+    Runs the keyset FTS query on conn for the page following `after`.
+    Returns (codes, position of the last row), or (codes, None) on the last page.
+    """
+    prefix_terms = [term + '*' for term in searchTerm.split()]
+    fts_query = ' '.join(prefix_terms)
 
-    conn.close()
+    rows = conn.execute(SEARCH_AFTER_QUERY, {
+        'exactSearch': searchTerm,
+        'ftsQuery': fts_query,
+        'afterTopSort': after[0],
+        'afterRank': after[1],
+        'afterRowId': after[2],
+        'limit': itemsPerPage
+    }).fetchall()
+
+    next_after = None
+    if rows and len(rows) == itemsPerPage:
+        last = rows[-1]
+        next_after = (last[2], last[1], last[3])
+    return [row[0] for row in rows], next_after
+
+# A department prefix plus at least one digit of the number, e.g. 'COP3', 'MAC 2311', 'cop3502c'.
+CODE_QUERY_PATTERN = re.compile(r'([A-Z]{3}) ?([0-9]{1,4}[A-Z]?)')
+
+def code_query_prefix(searchTerm):
+    """
+    Returns the course-code prefix a normalized searchTerm spells
+    ('cop 3502c' -> 'COP3502C'), or None if it is free text.
+    """
+    match = CODE_QUERY_PATTERN.fullmatch(searchTerm.upper())
+    return match.group(1) + match.group(2) if match else None
+
+def code_prefix_range(sorted_codes, prefix):
+    """
+    Returns the [lo, hi) slice of sorted_codes that start with prefix.
+    """
+    lo = bisect.bisect_left(sorted_codes, prefix)
+    hi = bisect.bisect_left(sorted_codes, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+    return lo, hi
+
+def code_prefix_page(sorted_codes, prefix, itemsPerPage, startFrom, after_code=None):
+    """
+    Returns (codes, next position) for one page of the codes starting with
+    prefix, in code order; an exact match is therefore first. Pages by
+    startFrom, or strictly after after_code when given.
+    """
+    lo, hi = code_prefix_range(sorted_codes, prefix)
+    start = max(lo, bisect.bisect_right(sorted_codes, after_code)) if after_code is not None else lo + startFrom
+    end = min(start + itemsPerPage, hi)
+    codes = sorted_codes[start:end] if start < end else []
+    return codes, (('code', codes[-1]) if codes and end < hi else None)
+
+def search_course_codes(store, searchTerm, itemsPerPage, startFrom, after=None):
+    """
+    Returns (codes, next position, path) for searchTerm in the term of
+    `store`. Uses keyset pagination when `after` is given, startFrom otherwise.
+
+    Query planner: a code-shaped searchTerm that prefixes at least one course
+    code is answered from the store's sorted code index ('code'). Anything
+    else runs the FTS query on the store's snapshot ('fts'), served from
+    search_cache when possible.
+    """
+    year, term = store.year, store.term
+    searchTerm = normalize_search_term(searchTerm)
+    prefix = code_query_prefix(searchTerm)
+    code_cursor = after is not None and after[0] == 'code'
+    if code_cursor or (prefix is not None and after in (None, FIRST_PAGE)):
+        sorted_codes = store.sorted_codes
+        if prefix is None:
+            # A code-path cursor sent with a free-text query.
+            return [], None, 'code'
+        lo, hi = code_prefix_range(sorted_codes, prefix)
+        if code_cursor or lo < hi:
+            after_code = after[1] if code_cursor else None
+            return code_prefix_page(sorted_codes, prefix, itemsPerPage, startFrom, after_code) + ('code',)
+
+    # Keyed by snapshot too, so a request that outlives a reload cannot
+    # cache the old snapshot's results for the new one.
+    key = (year, term, searchTerm, itemsPerPage, startFrom, after, store.path)
+    result = search_cache.get(key)
+    if result is None:
+        conn = store.conn()
+        if after is None:
+            result = (run_search(conn, searchTerm, itemsPerPage, startFrom), None)
+        else:
+            result = run_search_after(conn, searchTerm, itemsPerPage, after)
+        search_cache.put(key, result)
+    return result + ('fts',)
+
+search_path_counts = {'code': 0, 'fts': 0, 'fuzzy': 0}
+search_path_lock = threading.Lock()
+
+def record_search_path(path):
+    with search_path_lock:
+        search_path_counts[path] += 1
+
+def fuzzy_course_codes(store, searchTerm, itemsPerPage, startFrom):
+    """
+    Returns one page of fuzzy-ranked course codes, served from search_cache
+    when possible.
+    """
+    year, term = store.year, store.term
+    searchTerm = normalize_search_term(searchTerm).lower()
+    key = (year, term, ('fuzzy', searchTerm), itemsPerPage, startFrom, None, store.path)
+    result = search_cache.get(key)
+    if result is None:
+        ranked = fuzzy_index_map[(year, term)].search(searchTerm, startFrom + itemsPerPage, FUZZY_BUDGET_MS)
+        result = (ranked[startFrom:], None)
+        search_cache.put(key, result)
+    return result[0]
+
+def warm_search_cache(limit):
+    """
+    Pre-runs first-page searches for the `limit` most common department prefixes
+    of every loaded term. Uses a throwaway connection so nothing pooled is
+    opened before Gunicorn forks its workers.
+    """
+    for (year, term), store in course_data_map.items():
+        prefix_counts = {}
+        for code in store:
+            prefix_counts[code[:3]] = prefix_counts.get(code[:3], 0) + 1
+        top_prefixes = sorted(prefix_counts, key=prefix_counts.get, reverse=True)[:limit]
+
+        conn = get_connection(store.path)
+        for prefix in top_prefixes:
+            codes = run_search(conn, prefix, 20, 0)
+            search_cache.put((year, term, prefix, 20, 0, None, store.path), (codes, None))
+        conn.close()
+
+@app.route("/api/stats/pool", methods=['GET'])
+def pool_stats():
+    """
+    Returns this worker's connection pool counters (hits, opens, wait time).
+    """
+    stats = connection_pool.stats()
+    stats['pid'] = os.getpid()
+    return jsonify(stats)
+
+@app.route("/api/stats/cache", methods=['GET'])
+def cache_stats():
+    """
+    Returns this worker's search result cache counters (hits, misses, hit rate).
+    """
+    stats = search_cache.stats()
+    stats['pid'] = os.getpid()
+    return jsonify(stats)
+
+@app.route("/api/stats/search", methods=['GET'])
+def search_stats():
+    """
+    Returns how many of this worker's searches each query path served.
+    """
+    with search_path_lock:
+        stats = dict(search_path_counts)
+    stats['pid'] = os.getpid()
+    return jsonify(stats)
+
+@app.route("/api/autocomplete", methods=['POST'])
+def autocomplete():
+    """
+    Receives a JSON body with:
+      - searchTerm: the prefix typed so far
+      - limit: max suggestions (default 10, at most 50)
+      - year, term
+    Returns a JSON list of {code, codeWithSpace, name} whose code or name
+    (or a word of the name) starts with searchTerm. Served entirely from the
+    in-memory trie; SQLite is never touched.
+    """
+    data = request.get_json()
+    prefix = ' '.join(data.get('searchTerm', '').lower().split())
+    year = data.get('year')
+    term = data.get('term')
+
+    if not year or not term:
+        return jsonify({"error": "Missing 'year' or 'term' in request body"}), 400
+    try:
+        limit = max(1, min(int(data.get('limit', 10)), 50))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'limit' must be an integer"}), 400
+
+    index = autocomplete_map.get((year, term))
+    if not prefix or index is None:
+        return jsonify([])
+
+    trie, suggestions = index
+    return json_array_response([suggestions[code] for code in trie.find(prefix, limit)])
+
+def build_autocomplete_index(conn):
+    """
+    Builds the autocomplete trie for a term from courses_fts. Keys are the
+    lowercased code, codeWithSpace, full name and each name word of 3+ letters.
+    Returns (trie, {code -> serialized suggestion}).
+    """
+    trie = TrieNode()
+    suggestions = {}
+    for code, codeWithSpace, name in conn.execute('SELECT code, codeWithSpace, name FROM courses_fts ORDER BY code;'):
+        name = name or ''
+        suggestions[code] = serialize_course({'code': code, 'codeWithSpace': codeWithSpace, 'name': name})
+        trie.add(code.lower(), code)
+        if codeWithSpace:
+            trie.add(codeWithSpace.lower(), code)
+        name_key = ' '.join(name.lower().split())
+        if name_key:
+            trie.add(name_key, code)
+        for word in name_key.split()[1:]:
+            if len(word) >= 3:
+                trie.add(word, code)
+    trie.precompute_top(AUTOCOMPLETE_TOP_K, AUTOCOMPLETE_HOT_DEPTH)
+    return trie, suggestions
+
+@app.route("/api/filter_courses", methods=['POST'])
+def filter_courses():
+    """
+    Receives a JSON body with year, term and any of:
+      - searchTerm: only courses the FTS search matches
+      - startAfter: 'HH:MM', no meeting begins earlier (e.g. '10:00')
+      - endBefore: 'HH:MM', no meeting ends later
+      - days: e.g. ['M', 'W', 'F'], meetings only on these days
+      - minRating: some instructor has avgRating >= this
+      - maxDifficulty: some instructor has avgDifficulty <= this
+      - instructor: an instructor's name (case-insensitive)
+      - minCredits / maxCredits
+      - itemsPerPage, startFrom: paging over matching courses, ordered by code
+    Returns a JSON list of courses with at least one matching section, with
+    `sections` narrowed to the matching ones. Sections without meeting times
+    (online) pass the time and day filters.
+    """
+    data = request.get_json()
+    year = data.get('year')
+    term = data.get('term')
+    itemsPerPage = data.get('itemsPerPage', 20)
+    startFrom = data.get('startFrom', 0)
+
+    if not year or not term:
+        return jsonify({"error": "Missing 'year' or 'term' in request body"}), 400
+
+    conditions = []
+    params = []
+
+    searchTerm = normalize_search_term(data.get('searchTerm', ''))
+    if searchTerm:
+        conditions.append('code IN (SELECT code FROM courses_fts WHERE courses_fts MATCH ?)')
+        params.append(' '.join(word + '*' for word in searchTerm.split()))
+
+    for field, column, op in (('startAfter', 'earliest_begin', '>='), ('endBefore', 'latest_end', '<=')):
+        if data.get(field):
+            minutes = time_to_minutes(data[field])
+            if minutes is None:
+                return jsonify({"error": f"'{field}' must be HH:MM"}), 400
+            conditions.append(f'({column} IS NULL OR {column} {op} ?)')
+            params.append(minutes)
+
+    if data.get('days'):
+        if any(day not in DAY_BITS for day in data['days']):
+            return jsonify({"error": f"'days' may only contain {''.join(DAY_BITS)}"}), 400
+        allowed = 0
+        for day in data['days']:
+            allowed |= DAY_BITS[day]
+        conditions.append('(days_mask & ?) = 0')
+        params.append(~allowed & sum(DAY_BITS.values()))
+
+    for field, condition in (
+        ('minRating', 'max_rating >= ?'),
+        ('maxDifficulty', 'min_difficulty <= ?'),
+        ('minCredits', 'credits >= ?'),
+        ('maxCredits', 'credits <= ?'),
+    ):
+        if data.get(field) is not None:
+            conditions.append(condition)
+            params.append(data[field])
+
+    if data.get('instructor'):
+        conditions.append('''section_id IN (
+            SELECT section_id FROM section_instructors WHERE name = ? COLLATE NOCASE
+        )''')
+        params.append(data['instructor'].strip())
+
+    store = course_data_map.get((year, term))
+    if store is None:
+        return jsonify([])
+
+    where = ' AND '.join(conditions) if conditions else '1'
+    rows = store.conn().execute(f'''
+        WITH matched AS (
+            SELECT code, section_index FROM sections WHERE {where}
+        ),
+        page AS (
+            SELECT DISTINCT code FROM matched ORDER BY code LIMIT ? OFFSET ?
+        )
+        SELECT code, section_index FROM matched
+        WHERE code IN (SELECT code FROM page)
+        ORDER BY code, section_index
+    ''', params + [itemsPerPage, startFrom]).fetchall()
+
+    section_indexes = {}
+    for code, section_index in rows:
+        section_indexes.setdefault(code, set()).add(section_index)
+
+    results = []
+    for code, indexes in section_indexes.items():
+        course = store.get(code)
+        if course is None:
+            continue
+        course['sections'] = [
+            section for i, section in enumerate(course.get('sections', [])) if i in indexes
+        ]
+        results.append(course)
     return jsonify(results)
 
+@app.route("/api/generate_schedules", methods=['POST'])
+def generate_schedules():
+    """
+    Receives a JSON body with:
+      - courses: list of course codes, e.g. ['COP3502C', 'MAC2311']
+      - limit: max schedules to return (default 500, at most MAX_SCHEDULES)
+      - year, term
+    Streams conflict-free schedules as NDJSON, one per line:
+      {"sections": [{"code": ..., "classNumber": ...}, ...]}
+    with one section per requested course, in request order.
+    """
+    data = request.get_json()
+    year = data.get('year')
+    term = data.get('term')
+    codes = [code.upper().replace(' ', '') for code in data.get('courses', [])]
+
+    if not year or not term:
+        return jsonify({"error": "Missing 'year' or 'term' in request body"}), 400
+    try:
+        limit = max(1, min(int(data.get('limit', 500)), MAX_SCHEDULES))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'limit' must be an integer"}), 400
+    if not codes or len(codes) > MAX_SCHEDULE_COURSES:
+        return jsonify({"error": f"'courses' must list 1 to {MAX_SCHEDULE_COURSES} course codes"}), 400
+
+    store = course_data_map.get((year, term), {})
+    courses = {code: store.get(code) for code in dict.fromkeys(codes)}
+    missing = [code for code in codes if courses[code] is None]
+    if missing:
+        return jsonify({"error": "Unknown course codes", "missing": missing}), 400
+
+    builder = ScheduleBuilder([(code, course.get('sections', [])) for code, course in courses.items()])
+
+    def stream():
+        for schedule in builder.schedules(limit):
+            yield json.dumps({"sections": [
+                {"code": code, "classNumber": section.get('classNumber')}
+                for code, section in schedule
+            ]}, separators=(',', ':')) + '\n'
+
+    return app.response_class(stream_with_context(stream()), mimetype='application/x-ndjson')
+
+@app.route("/api/courses/batch", methods=['POST'])
+def courses_batch():
+    """
+    Receives a JSON body with:
+      - codes: list of course codes, e.g. ['COP3502C', 'MAC 2311']
+        (at most MAX_BATCH_CODES)
+      - year, term
+    Returns {"courses": [...], "missing": [...]}: the stored course objects
+    for the known codes in request order (duplicates once), and the codes
+    that are not offered in the term. The course bodies are the
+    pre-serialized blobs, fetched with one query.
+    """
+    data = request.get_json()
+    year = data.get('year')
+    term = data.get('term')
+    codes = data.get('codes')
+
+    if not year or not term:
+        return jsonify({"error": "Missing 'year' or 'term' in request body"}), 400
+    if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+        return jsonify({"error": "'codes' must be a list of course codes"}), 400
+    codes = list(dict.fromkeys(code.upper().replace(' ', '') for code in codes))
+    if len(codes) > MAX_BATCH_CODES:
+        return jsonify({"error": f"'codes' may list at most {MAX_BATCH_CODES} course codes"}), 400
+
+    store = course_data_map.get((year, term), {})
+    found = [code for code in codes if code in store]
+    blobs_by_code = dict(zip(found, store.get_blobs(found))) if found else {}
+    blobs = [blobs_by_code[code] for code in found if blobs_by_code[code] is not None]
+    missing = [code for code in codes if blobs_by_code.get(code) is None]
+    body = b'{"courses":[' + b','.join(blobs) + b'],"missing":' + json.dumps(missing, separators=(',', ':')).encode('utf-8') + b'}'
+    return app.response_class(body, mimetype='application/json')
+
+@app.route("/api/search_terms", methods=['POST'])
+def search_terms():
+    """
+    Receives a JSON body with:
+      - searchTerm: the query string
+      - terms: (optional) list of {"year": '25', "term": 'fall'}; defaults
+        to every loaded term
+      - itemsPerPage, startFrom: paging over the merged results
+    Returns a JSON list of {"year", "term", "course"} from all the terms,
+    ranked together: code-shaped searches in code order (then term order),
+    free text like get_courses (exact codeWithSpace match, then bm25).
+    The X-Search-Path header reports 'code' or 'fts'.
+    """
+    data = request.get_json()
+    searchTerm = normalize_search_term(data.get('searchTerm', ''))
+    itemsPerPage = data.get('itemsPerPage', 20)
+    startFrom = data.get('startFrom', 0)
+
+    # Each term's store is taken once, so its search and bodies come from one snapshot.
+    stores = dict(course_data_map)
+    loaded = sorted(stores)
+    if data.get('terms') is None:
+        keys = loaded
+    elif isinstance(data['terms'], list) and all(isinstance(t, dict) for t in data['terms']):
+        wanted = {(t.get('year'), t.get('term')) for t in data['terms']}
+        keys = [key for key in loaded if key in wanted]
+    else:
+        return jsonify({"error": "'terms' must be a list of {year, term} objects"}), 400
+
+    if not searchTerm or not keys:
+        return jsonify([])
+
+    hits, path = search_terms_codes(stores, keys, searchTerm, itemsPerPage, startFrom)
+    record_search_path(path)
+
+    codes_by_key = {}
+    for key, code in hits:
+        codes_by_key.setdefault(key, []).append(code)
+    blobs_by_key = {key: dict(zip(codes, stores[key].get_blobs(codes))) for key, codes in codes_by_key.items()}
+    items = [
+        b'{"course":' + blobs_by_key[key][code] + b',"term":' + json.dumps(key[1]).encode('utf-8') +
+        b',"year":' + json.dumps(key[0]).encode('utf-8') + b'}'
+        for key, code in hits
+        if blobs_by_key[key][code] is not None
+    ]
+    response = json_array_response(items)
+    response.headers['X-Search-Path'] = path
+    return response
+
+def search_terms_codes(stores, keys, searchTerm, itemsPerPage, startFrom):
+    """
+    Returns ([((year, term), code), ...], path) for one page of searchTerm
+    across the given terms of `stores` ({(year, term): CourseStore}).
+
+    Code-shaped searches use each term's code index. Free text runs one
+    UNION ALL over the FTS tables of up to ATTACH_LIMIT term DBs attached to
+    a single pooled connection. Terms are split into fixed chunks of the
+    loaded list, so each thread keeps at most one connection per chunk.
+    Each chunk returns its best startFrom + itemsPerPage rows, and those
+    runs are merged.
+    """
+    prefix = code_query_prefix(searchTerm)
+    if prefix is not None:
+        hits = []
+        for key in keys:
+            sorted_codes = stores[key].sorted_codes
+            lo, hi = code_prefix_range(sorted_codes, prefix)
+            hits.extend((code, key) for code in sorted_codes[lo:hi])
+        if hits:
+            hits.sort()
+            return [(key, code) for code, key in hits[startFrom:startFrom + itemsPerPage]], 'code'
+
+    fts_query = ' '.join(word + '*' for word in searchTerm.split())
+    wanted = set(keys)
+    loaded = sorted(stores)
+    limit = ConnectionPool.ATTACH_LIMIT
+    runs = []
+    for start in range(0, len(loaded), limit):
+        chunk = loaded[start:start + limit]
+        slots = [slot for slot, key in enumerate(chunk) if key in wanted]
+        if not slots:
+            continue
+        sql = ' UNION ALL '.join(f'''
+            SELECT
+                CASE WHEN codeWithSpace = :exactSearch THEN 0 ELSE 1 END AS top_sort,
+                bm25(courses_fts) AS rank,
+                {start + slot} AS term_index,
+                code
+            FROM t{slot}.courses_fts
+            WHERE courses_fts MATCH :ftsQuery
+        ''' for slot in slots) + ' ORDER BY top_sort, rank, term_index, code LIMIT :limit'
+        rows = connection_pool.get_attached(chunk, [stores[key].path for key in chunk]).execute(sql, {
+            'exactSearch': searchTerm,
+            'ftsQuery': fts_query,
+            'limit': startFrom + itemsPerPage,
+        }).fetchall()
+        runs.append([tuple(row) for row in rows])
+
+    merged = list(heapq.merge(*runs))[startFrom:startFrom + itemsPerPage]
+    return [(loaded[term_index], code) for _, _, term_index, code in merged], 'fts'
+
+@app.route("/api/catalog/<year>/<term>", methods=['GET'])
+def catalog(year, term):
+    """
+    Returns every course of the term as one JSON list, in code order.
+    The body was built and compressed once, when the term data was written,
+    and is read from the term DB at load; it is sent brotli- or gzip-encoded
+    per Accept-Encoding (decompressed only for clients that accept
+    neither). Carries a weak content-hash ETag and answers a matching
+    If-None-Match with 304.
+    """
+    entry = catalog_map.get((year, term))
+    if entry is None:
+        return jsonify({"error": f"No catalog for {year} {term}"}), 404
+
+    if request.if_none_match.contains_weak(entry['etag']):
+        response = app.response_class(status=304)
+    elif entry['br'] is not None and request.accept_encodings.quality('br') > 0:
+        response = app.response_class(entry['br'], mimetype='application/json')
+        response.headers['Content-Encoding'] = 'br'
+    elif request.accept_encodings.quality('gzip') > 0:
+        response = app.response_class(entry['gzip'], mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = app.response_class(zlib.decompress(entry['gzip'], 31), mimetype='application/json')
+
+    response.set_etag(entry['etag'], weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# -------------------------------------------------------------------
+# 4. Hot reload of term data
+#    A per-worker watcher polls courses/ and re-runs init_db_for_file for new
+#    or modified final JSON files; /api/admin/reload does the same on demand.
+# -------------------------------------------------------------------
+# Seconds between checks of courses/ (0 disables the watcher).
+RELOAD_INTERVAL = int(os.environ.get('RELOAD_INTERVAL', 60))
+# Token required by /api/admin/reload (the endpoint is disabled when unset).
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+reload_lock = threading.Lock()
+watcher_pid = None
+
+def reload_changed_terms(only=None):
+    """
+    Reloads every term whose newest final JSON or set of changesets differs
+    from what is loaded, or just the (year, term) in `only`. Returns the
+    list of reloaded terms.
+    """
+    reloaded = []
+    with reload_lock:
+        for key, path in latest_term_files(glob.glob('courses/*_final.json')).items():
+            if only is not None and key != only:
+                continue
+            st = os.stat(path)
+            if loaded_sources.get(key) == (path, f'{st.st_size}:{st.st_mtime_ns}', tuple(term_changeset_files(*key))):
+                continue
+            init_db_for_file(path)
+            reloaded.append(key)
+    return reloaded
+
+def watch_course_files():
+    while True:
+        time.sleep(RELOAD_INTERVAL)
+        try:
+            for year, term in reload_changed_terms():
+                print(f"Reloaded {year} {term} in worker {os.getpid()}")
+        except Exception as e:
+            print(f"Reload failed: {e}")
+
+@app.before_request
+def start_course_watcher():
+    """
+    Starts the watcher thread once per process. Done on the first request
+    rather than at import so each forked Gunicorn worker gets its own thread.
+    """
+    global watcher_pid
+    if RELOAD_INTERVAL <= 0 or watcher_pid == os.getpid():
+        return
+    with reload_lock:
+        if watcher_pid != os.getpid():
+            watcher_pid = os.getpid()
+            threading.Thread(target=watch_course_files, daemon=True).start()
+
+@app.route("/api/admin/reload", methods=['POST'])
+def admin_reload():
+    """
+    Reloads changed term data in this worker. Other workers pick the change
+    up on their next watcher poll, finding the DB already synced.
+    Optional JSON body: {"year": '25', "term": 'fall'} to reload one term.
+    """
+    supplied = request.headers.get('X-Admin-Token', '').encode('utf-8')
+    if not ADMIN_TOKEN or not hmac.compare_digest(supplied, ADMIN_TOKEN.encode('utf-8')):
+        return jsonify({"error": "Forbidden"}), 403
+
+    data = request.get_json(silent=True) or {}
+    only = (data['year'], data['term']) if data.get('year') and data.get('term') else None
+    reloaded = reload_changed_terms(only)
+    return jsonify({"reloaded": [{"year": year, "term": term} for year, term in reloaded]})
+
 # -------------------------------------------------------------------
-# 5. /generate_a_list (same as your original)
+# 5. /generate_a_list (prerequisite graph for a major)
 # -------------------------------------------------------------------
 @app.route('/generate_a_list', methods=['POST'])
 def generate_a_list():
+    """
+    Returns the Cytoscape {nodes, edges} prerequisite graph for a major.
+    With "stream": true the elements are sent as NDJSON instead, one per
+    line with a "group" of "nodes" or "edges".
+    """
     data = request.get_json()
-    G = nx.DiGraph()
 
     selected_major = data['selectedMajorServ']
     taken_courses = data['selectedCoursesServ']
@@ -221,21 +1500,64 @@ def generate_a_list():
         for course in taken_courses
     ]
 
-    # Add each taken course as a node
-    for course in formatted_taken_courses:
-        G.add_node(course)
+    graph = initiateList(selected_major, year, term)
+
+    if data.get('stream'):
+        return app.response_class(
+            stream_with_context(graph.cytoscape_lines(formatted_taken_courses)),
+            mimetype='application/x-ndjson'
+        )
+    return app.response_class(graph.cytoscape_json(formatted_taken_courses), mimetype='application/json')
+
+@app.route('/api/next_courses', methods=['POST'])
+def next_courses():
+    """
+    Receives a JSON body with:
+      - selectedCoursesServ: codes the student has taken
+      - year, term
+      - selectedMajorServ: (optional) only suggest courses whose department name contains it
+      - includeNoPrereqs: (optional, default true) false to leave courses with
+        no listed prerequisites out of `available`
+    Returns:
+      - closure: every transitive prerequisite of the taken courses, across
+        departments, prerequisites first (plain codes such as 'MAC2311')
+      - available: offered courses not yet taken whose listed prerequisites are
+        all taken or implied by the closure, including courses that list none
+    Every code found in a course's prerequisite text is treated as required.
+    """
+    data = request.get_json()
+    taken_courses = data.get('selectedCoursesServ', [])
+    selected_major = data.get('selectedMajorServ', '')
+    include_open = data.get('includeNoPrereqs', True) is not False
+    year = data.get('year')
+    term = data.get('term')
+
+    if not year or not term:
+        return jsonify({"error": "Missing 'year' or 'term' in request body"}), 400
 
-    initiateList(G, selected_major, year, term)
+    index = prereq_index_map.get((year, term))
+    if index is None:
+        return jsonify({"closure": [], "available": []})
 
-    nodes = [
-        {"data": {"id": node}, "classes": "selected" if node in formatted_taken_courses else "not_selected"}
-        for node in G.nodes()
+    reachability = index['reachability']
+    taken_bases = [
+        course.upper().replace(' ', '').rstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+        for course in taken_courses
     ]
-    edges = [{"data": {"source": edge[0], "target": edge[1]}} for edge in G.edges()]
+    closure_mask = reachability.closure_mask(taken_bases)
+    taken_mask = reachability.mask_of(taken_bases)
+    satisfied_mask = closure_mask | taken_mask
+
+    dept_map = course_dept_map.get((year, term), {})
+    available = []
+    for base_code in reachability.unlocked(satisfied_mask, index['codes_by_base'], include_open):
+        for code in index['codes_by_base'][base_code]:
+            if not selected_major or selected_major in dept_map.get(code, ''):
+                available.append(code)
 
     return jsonify({
-        'nodes': nodes,
-        'edges': edges
+        "closure": reachability.codes_in(closure_mask & ~taken_mask),
+        "available": available
     })
 
 def clean_prereq(prerequisites):
@@ -245,29 +1567,79 @@ def clean_prereq(prerequisites):
 def format_course_code(course):
     return course[:3] + '\n' + course[3:]
 
-def initiateList(G, selected_major, year, term):
-    if not selected_major:
-        return
+def build_prereq_index(conn, dept_map):
+    """
+    Precomputes, once per term load, what initiateList needs:
+      - table: CodeTable interning every formatted course node
+      - edges_by_code: code -> [(prereq node id, course node id)] from its prerequisites
+      - codes_by_dept: deptName -> [codes]
+      - reachability: ReachabilityIndex over plain codes across all departments
+      - codes_by_base: plain code (e.g. 'COP3502') -> [offered codes, e.g. 'COP3502C']
+    Prerequisite text is read from courses_fts so no course body is decoded.
+    """
+    table = CodeTable()
+    edges_by_code = {}
+    prereqs_by_base = {}
+    codes_by_base = {}
+    for course_code, prerequisites in conn.execute('SELECT code, prerequisites FROM courses_fts;'):
+        base_code = course_code.rstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZ ')
+        course_code_formatted = format_course_code(base_code)
+        codes_by_base.setdefault(base_code, []).append(course_code)
+        base_prereqs = prereqs_by_base.setdefault(base_code, {})
+        edges = []
+        for prereq in clean_prereq(prerequisites or ''):
+            prereq_base = prereq.replace(" ", "").rstrip(' ')
+            prereq_formatted = format_course_code(prereq_base)
+            if course_code_formatted != prereq_formatted:
+                edges.append((table.intern(prereq_formatted), table.intern(course_code_formatted)))
+                base_prereqs[prereq_base] = None
+        if edges:
+            edges_by_code[course_code] = edges
 
-    # Access the correct course_dept_map and course_data_map for the given year and term
-    dept_map = course_dept_map.get((year, term), {})
-    course_map = course_data_map.get((year, term), {})
+    codes_by_dept = {}
+    for code, dept in dept_map.items():
+        codes_by_dept.setdefault(dept, []).append(code)
 
-    # Filter courses by department name
-    relevant_courses = {
-        code for code, dept in dept_map.items()
-        if selected_major in dept
+    return {
+        'table': table,
+        'edges_by_code': edges_by_code,
+        'codes_by_dept': codes_by_dept,
+        'reachability': ReachabilityIndex(prereqs_by_base),
+        'codes_by_base': codes_by_base
     }
 
-    for course_code in relevant_courses:
-        course = course_map.get(course_code, {})
-        prereq_list = clean_prereq(course.get("prerequisites", ""))
+def initiateList(selected_major, year, term):
+    """
+    Returns the PrereqGraph of every course whose department name contains
+    selected_major, cached per (year, term, major).
+    """
+    index = prereq_index_map.get((year, term))
+    if not selected_major or index is None:
+        return PrereqGraph(index['table'] if index else CodeTable())
+
+    key = (year, term, selected_major)
+    graph = major_graph_cache.get(key)
+    if graph is not None:
+        return graph
 
-        course_code_formatted = format_course_code(course_code.rstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZ '))
-        for prereq in prereq_list:
-            prereq_formatted = format_course_code(prereq.replace(" ", "").rstrip(' '))
-            if course_code_formatted != prereq_formatted:
-                G.add_edge(prereq_formatted, course_code_formatted)
+    edges = {}
+    for dept, codes in index['codes_by_dept'].items():
+        if selected_major in dept:
+            for code in codes:
+                edges.update(dict.fromkeys(index['edges_by_code'].get(code, ())))
+    graph = PrereqGraph(index['table'], edges)
+    major_graph_cache.put(key, graph)
+    return graph
+
+# -------------------------------------------------------------------
+# Initialize a DB for each final JSON on startup, once every helper
+# used while loading a term is defined.
+# -------------------------------------------------------------------
+for jpath in latest_term_files(json_files).values():
+    init_db_for_file(jpath)
+
+if CACHE_WARM_PREFIXES > 0:
+    warm_search_cache(CACHE_WARM_PREFIXES)
 
 # -------------------------------------------------------------------
 # 6. Optional: run the app